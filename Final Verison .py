@@ -1,152 +1,2187 @@
-import tkinter as tk
-from tkinter import ttk
-from tkinterweb import HtmlFrame
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import geopandas as gpd
-import matplotlib.pyplot as plt
-from PIL import Image, ImageTk
-
-class WikipediaViewer(tk.Toplevel):
-    def __init__(self, master, title):
-        super().__init__(master)
-        self.title("Details")
-
-        # Make the window maximized
-        self.maximize_window()
-
-        # Create and pack HtmlFrame for web content
-        self.html_frame = HtmlFrame(self, horizontal_scrollbar="auto", vertical_scrollbar="auto")
-        self.html_frame.pack(fill="both", expand=True, padx=10, pady=10)
-
-        # Load the Wikipedia page
-        url = f"https://en.wikipedia.org/wiki/{title.replace(' ', '_')}"
-        self.html_frame.load_url(url)
-
-    def maximize_window(self):
-        # Get screen dimensions
-        width = self.winfo_screenwidth()
-        height = self.winfo_screenheight()
-        # Set window size to screen dimensions
-        self.geometry(f"{width}x{height}+0+0")
-
-class MapTab(tk.Frame):
-    def __init__(self, parent, geojson_path, title, map_color, bg_color, flag_image_path, *args, **kwargs):
-        super().__init__(parent, *args, **kwargs)
-        self.geojson_path = geojson_path
-        self.title = title
-        self.map_color = map_color
-        self.bg_color = bg_color
-
-        # Create a figure and axis
-        self.fig, self.ax = plt.subplots()
-        self.current_province = None
-        self.default_color = map_color  # Default color
-        self.clicked_color = '#007FFF'  # Color for clicked province
-        self.border_color = 'black'  # Border color
-        self.border_width = 1  # Border width
-
-        # Set the background color for the figure and axis
-        self.fig.patch.set_facecolor(bg_color)  # Background color for figure
-        self.ax.set_facecolor(bg_color)  # Background color for axis
-
-        # Load the GeoJSON file
-        self.data = gpd.read_file(self.geojson_path)
-        self.data['color'] = self.default_color
-
-        # Plot the GeoDataFrame with border and colors
-        self.data.plot(ax=self.ax, color=self.data['color'], edgecolor=self.border_color, linewidth=self.border_width)
-
-        # Remove axis labels and ticks
-        self.ax.set_axis_off()
-
-        # Create a canvas to embed the plot
-        self.canvas = FigureCanvasTkAgg(self.fig, master=self)
-        self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=1)
-
-        # Connect the event handler
-        self.canvas.mpl_connect("button_press_event", self.on_click)
-
-        # Add the flag image
-        self.add_flag_image(flag_image_path)
-
-    def add_flag_image(self, flag_image_path):
-        # Load and resize the flag image
-        flag_img = Image.open(flag_image_path).resize((200, 120))
-        self.flag_photo = ImageTk.PhotoImage(flag_img)
-
-        # Create a label with the flag image
-        self.flag_label = tk.Label(self, image=self.flag_photo)
-        self.flag_label.image = self.flag_photo
-        self.flag_label.place(x=10, y=10)
-
-        # Bind click event to the label
-        self.flag_label.bind("<Button-1>", lambda e: WikipediaViewer(self, self.title))
-
-    def on_click(self, event):
-        # Get the clicked point coordinates
-        x, y = event.xdata, event.ydata
-        if x is not None and y is not None:
-            # Find the province that contains the clicked point
-            point = gpd.points_from_xy([x], [y])
-            province = self.data[self.data.contains(point[0])]
-            if not province.empty:
-                province_index = province.index[0]
-                # If there's a previously clicked province, revert its color
-                if self.current_province is not None:
-                    self.data.loc[self.current_province, 'color'] = self.default_color
-                # Update the clicked province's color
-                self.data.loc[province_index, 'color'] = self.clicked_color
-                self.current_province = province_index
-
-                # Clear the previous plot
-                self.ax.clear()
-                # Replot the GeoDataFrame with updated colors and borders
-                self.data.plot(ax=self.ax, color=self.data['color'], edgecolor=self.border_color, linewidth=self.border_width)
-
-                # Set the background color for the axis and figure again
-                self.ax.set_facecolor(self.bg_color)  # Background color for axis
-                self.fig.patch.set_facecolor(self.bg_color)  # Background color for figure
-
-                # Remove axis labels and ticks
-                self.ax.set_axis_off()
-
-                # Redraw the canvas
-                self.canvas.draw()
-
-                # Get the name of the province
-                province_name = province.iloc[0]['NAME_1']  # Adjust this to the correct column name
-                print(f"Clicked on: {province_name}")
-
-                # Open the WikipediaViewer with the selected province
-                WikipediaViewer(self, province_name)
-
-class MapApp(tk.Tk):
-    def __init__(self):
-        super().__init__()
-        self.title("Interactive Map by Maneesh")
-        self.geometry("1200x800")
-
-        self.style = ttk.Style()
-        self.style.configure('TNotebook.Tab', font=('Helvetica', 14, 'bold'), padding=[10, 5])
-
-        # Create a notebook (tabbed interface)
-        self.notebook = ttk.Notebook(self)
-        self.notebook.pack(fill="both", expand=True)
-
-        # Add tabs for China, India, and USA maps with specific colors and flags
-        self.china_tab = MapTab(self.notebook, "china.geojson", "China", '#FF003F', '#FFFF00', "china.png")
-        self.india_tab = MapTab(self.notebook, "india.geojson", "India", '#FF9933', '#009E49', "india.png")
-        self.usa_tab = MapTab(self.notebook, "usa.geojson", "USA", '#0033A0', '#FF003F', "USA.png")
-        self.EU_tab = MapTab(self.notebook, "EU.geojson", "Europe", '#0033A0', '#FFD700', "EU.png")
-
-        # Add tabs to the notebook
-        
-        self.notebook.add(self.india_tab, text="India")
-        self.notebook.add(self.china_tab, text="China")
-        self.notebook.add(self.usa_tab, text="USA")
-        self.notebook.add(self.EU_tab, text="EU")
-
-if __name__ == "__main__":
-    app = MapApp()
-    app.mainloop()
-
+import time
+
+# Reference point for the startup-time report, taken before the heavy imports
+STARTUP_TIME = time.perf_counter()
+
+import argparse
+import contextlib
+import functools
+import hashlib
+import heapq
+import itertools
+import json
+import multiprocessing
+import os
+import re
+import shutil
+import subprocess
+import sys
+import threading
+import urllib.request
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+import tkinter as tk
+from tkinter import filedialog, ttk
+from tkinterweb import HtmlFrame
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.colors import Normalize, to_rgba
+from matplotlib.figure import Figure
+from matplotlib.lines import Line2D
+from matplotlib.patches import PathPatch
+from matplotlib.path import Path
+from matplotlib.transforms import Bbox
+from shapely.geometry.polygon import orient
+import shapely
+import geopandas as gpd
+import matplotlib
+import numpy as np
+import pandas as pd
+from PIL import Image, ImageTk
+
+# The geometry cache needs pyarrow, without it the maps are read straight from GeoJSON
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# TOML manifests need tomllib (Python 3.11+), JSON ones work everywhere
+try:
+    import tomllib
+except ImportError:
+    tomllib = None
+
+# The file name has a space, so the script can't be imported by it; benchmarks.py and process pool workers find it under this name
+sys.modules.setdefault('interactive_map', sys.modules[__name__])
+
+# Column every map's province names are normalized into, metric and time-series CSVs join on it too
+NAME_COLUMN = 'NAME_1'
+
+# Every map the app knows about, only this metadata is read at startup, and only by the code that needs it
+MANIFEST_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "maps.json")
+
+def load_manifest(path):
+    # Map entries from a JSON or TOML manifest, file paths in it are relative to the manifest
+    with open(path, 'rb') as f:
+        if path.endswith('.toml'):
+            if tomllib is None:
+                raise ValueError(f"{path}: TOML manifests need Python 3.11 or later")
+            manifest = tomllib.load(f)
+        else:
+            manifest = json.load(f)
+
+    base = os.path.dirname(os.path.abspath(path))
+    entries = []
+    for entry in manifest['maps']:
+        missing = [key for key in ('name', 'geojson', 'map_color', 'bg_color') if key not in entry]
+        if missing:
+            raise ValueError(f"{path}: map {entry.get('name', len(entries))} is missing {', '.join(missing)}")
+        # 'names' lists the fields holding each province's name, the first one that is filled in wins
+        # 'open' maps get a tab at startup, the others are opened from the map switcher
+        entry = {'title': entry['name'], 'flag': None, 'names': [NAME_COLUMN], 'open': False, **entry}
+        entry['geojson'] = os.path.join(base, entry['geojson'])
+        if entry['flag']:
+            entry['flag'] = os.path.join(base, entry['flag'])
+        entries.append(entry)
+    return entries
+
+# Per-province bounds recorded at load time
+BOUNDS_COLUMNS = ['minx', 'miny', 'maxx', 'maxy']
+
+CLICKED_COLOR = '#007FFF'  # Color for clicked province
+BORDER_COLOR = 'black'  # Border color
+BORDER_WIDTH = 1  # Border width
+
+def map_style(map_color, bg_color):
+    # Everything needed to draw a map the way its tab does, without Tk
+    return {'map_color': map_color, 'bg_color': bg_color, 'border_color': BORDER_COLOR, 'border_width': BORDER_WIDTH, 'clicked_color': CLICKED_COLOR}
+
+# Parsed maps are kept here as Parquet (attributes plus WKB geometry) so later launches skip the GeoJSON parse
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".geocache")
+
+# Fetched detail pages, shared between launches
+PAGE_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".pagecache")
+
+# Flags and other images, resized once per pixel size and kept as PNGs between launches
+ASSET_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".assetcache")
+
+# Bump when prepare_geodata changes, so every cached map is rebuilt with the new cleanup
+PIPELINE_VERSION = 1
+
+# Spans that end with new pixels on screen, counted for the frame rate
+# A composite only runs inside a canvas draw, which counts the frame already
+FRAME_SPANS = {'draw', 'repaint', 'overlay', 'pan'}
+
+# Shared by every disabled span, entering and leaving it does nothing
+NO_SPAN = contextlib.nullcontext()
+
+class TraceSpan:
+    __slots__ = ('tracer', 'name', 'start')
+
+    def __init__(self, tracer, name):
+        self.tracer = tracer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.tracer.record(self.name, self.start, time.perf_counter())
+
+class Tracer:
+    # Named timing spans on the load, click, hover and draw paths
+    # Off by default, a disabled span costs one attribute check and returns the shared no-op context
+    def __init__(self, path=None, max_events=1_000_000):
+        self.enabled = False
+        self.path = None
+        self.events = deque(maxlen=max_events)
+        self.latest = {}  # Last duration per span name in ms, for the overlay
+        self.frames = deque(maxlen=1000)  # End times of recent FRAME_SPANS
+        self.origin = time.perf_counter()
+        if path:
+            self.enable(path)
+
+    def enable(self, path=None):
+        # Start recording, the trace is written to `path` by export() when one is given
+        self.enabled = True
+        self.path = path or self.path
+
+    def span(self, name):
+        if not self.enabled:
+            return NO_SPAN
+        return TraceSpan(self, name)
+
+    def wrap(self, name, function):
+        # Traced version of a function, only wrap when enabled so the untraced path is left as it was
+        @functools.wraps(function)
+        def traced(*args, **kwargs):
+            with self.span(name):
+                return function(*args, **kwargs)
+        return traced
+
+    def record(self, name, start, end):
+        # Called from worker threads too, deque appends and dict stores are atomic
+        self.events.append((name, start, end, threading.get_ident()))
+        self.latest[name] = 1000 * (end - start)
+        if name in FRAME_SPANS:
+            self.frames.append(end)
+
+    def frame_rate(self, window=1.0):
+        since = time.perf_counter() - window
+        return sum(1 for end in list(self.frames) if end >= since) / window
+
+    def durations(self):
+        # Span lengths in ms by name
+        result = {}
+        for name, start, end, thread in list(self.events):
+            result.setdefault(name, []).append(1000 * (end - start))
+        return result
+
+    def summary(self):
+        # Count, percentiles and a histogram with power-of-two millisecond buckets per span name
+        result = {}
+        for name, values in sorted(self.durations().items()):
+            values = np.asarray(values)
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            buckets, counts = np.unique(np.ceil(np.log2(np.maximum(values, 1 / 64))), return_counts=True)
+            result[name] = {'count': len(values), 'mean_ms': float(values.mean()), 'p50_ms': float(p50), 'p95_ms': float(p95), 'p99_ms': float(p99), 'max_ms': float(values.max()),
+                            'histogram': {f"<={2.0 ** bucket:g} ms": int(count) for bucket, count in zip(buckets, counts)}}
+        return result
+
+    def print_summary(self):
+        print(f"{'span':<14}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+        for name, stats in self.summary().items():
+            print(f"{name:<14}{stats['count']:>8}{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}{stats['p99_ms']:>10.2f}{stats['max_ms']:>10.2f}")
+
+    def export(self, path=None):
+        # Chrome trace event format, opens in chrome://tracing and Perfetto; the histograms ride along in otherData
+        pid = os.getpid()
+        events = [{'name': name, 'ph': 'X', 'ts': 1e6 * (start - self.origin), 'dur': 1e6 * (end - start), 'pid': pid, 'tid': thread}
+                  for name, start, end, thread in list(self.events)]
+        with open(path or self.path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms', 'otherData': {'histograms': self.summary()}}, f)
+
+# Set MAP_TRACE to a file name to record a trace of the whole session, --trace does the same
+TRACER = Tracer(os.environ.get('MAP_TRACE'))
+
+def file_digest(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+def load_geodata(path, cache_dir=CACHE_DIR, names=(NAME_COLUMN,)):
+    # `names` is the map's name schema from the manifest, part of the cache key since it changes the cleaned data
+    names = list(names)
+    if pyarrow is None:
+        return prepare_geodata(gpd.read_file(path), names, path)
+
+    # The index remembers each source's hash by mtime and size, so unchanged files are not re-hashed
+    index_path = os.path.join(cache_dir, "index.json")
+    try:
+        with open(index_path) as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        index = {}
+
+    source = os.path.abspath(path)
+    stat = os.stat(source)
+    entry = index.get(source)
+    if entry is None or entry['mtime'] != stat.st_mtime_ns or entry['size'] != stat.st_size:
+        entry = {'mtime': stat.st_mtime_ns, 'size': stat.st_size, 'sha1': file_digest(source)}
+    # The cleanup settings are part of the key, a new pipeline or name schema never reuses an old entry
+    pipeline = hashlib.sha1(json.dumps([PIPELINE_VERSION, names]).encode()).hexdigest()[:12]
+    entry = {**entry, 'cache': f"{entry['sha1']}-{pipeline}.parquet"}
+    cache_path = os.path.join(cache_dir, entry['cache'])
+
+    if os.path.exists(cache_path):
+        try:
+            data = read_geodata_cache(cache_path)
+        except (OSError, ValueError, KeyError, pyarrow.ArrowException):
+            data = None
+        if data is not None:
+            if index.get(source) != entry:
+                update_cache_index(cache_dir, index_path, index, source, entry)
+            return data
+
+    # Cache miss or stale entry: parse and clean the GeoJSON and store the result for next time
+    data = prepare_geodata(gpd.read_file(source), names, path)
+    # The cache is only a speed-up, a read-only or full disk still loads the map
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        write_geodata_cache(cache_path, data)
+        update_cache_index(cache_dir, index_path, index, source, entry)
+    except OSError as e:
+        print(f"Could not cache {path}: {e}")
+    return data
+
+def update_cache_index(cache_dir, index_path, index, source, entry):
+    # Point the source at its new cache file and delete the one it replaces, unless another source still uses it
+    old = index.get(source, {}).get('cache')
+    index[source] = entry
+    try:
+        write_cache_index(index_path, index)
+    except OSError:
+        return
+    if old and old != entry['cache'] and all(other.get('cache') != old for other in index.values()):
+        try:
+            os.remove(os.path.join(cache_dir, old))
+        except OSError:
+            pass
+
+def write_geodata_cache(cache_path, data):
+    # Geometry as WKB plus the CRS as a plain string, which is much cheaper to restore than GeoParquet's PROJJSON
+    table = pyarrow.Table.from_pandas(pd.DataFrame(data.drop(columns=data.geometry.name)), preserve_index=True)
+    table = table.append_column('__wkb__', pyarrow.array(shapely.to_wkb(data.geometry.values), type=pyarrow.binary()))
+    crs = data.crs.to_string() if data.crs is not None else ''
+    table = table.replace_schema_metadata({**table.schema.metadata, b'crs': crs.encode(), b'geometry': data.geometry.name.encode()})
+    temp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        pyarrow.parquet.write_table(table, temp_path)
+        os.replace(temp_path, cache_path)
+    except OSError:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def read_geodata_cache(cache_path):
+    table = pyarrow.parquet.read_table(cache_path)
+    metadata = table.schema.metadata
+    geometry = shapely.from_wkb(table.column('__wkb__').to_numpy(zero_copy_only=False))
+    attributes = table.drop_columns(['__wkb__']).to_pandas()
+    crs = metadata[b'crs'].decode() or None
+    return gpd.GeoDataFrame(attributes, geometry=gpd.GeoSeries(geometry, index=attributes.index, crs=crs, name=metadata[b'geometry'].decode()))
+
+def write_cache_index(index_path, index):
+    # Write to a temporary file first so a crash never leaves a half-written index
+    temp_path = f"{index_path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(index, f, indent=1)
+    os.replace(temp_path, index_path)
+
+def polygonal(geometry):
+    # Polygon or MultiPolygon part of a geometry, repairs and overlays can leave stray lines and points
+    if geometry is None or geometry.geom_type in ('Polygon', 'MultiPolygon'):
+        return geometry
+    parts = [part for part in shapely.get_parts(geometry) if part.geom_type in ('Polygon', 'MultiPolygon')]
+    parts = [polygon for part in parts for polygon in getattr(part, 'geoms', [part])]
+    if not parts:
+        return shapely.Polygon()
+    return parts[0] if len(parts) == 1 else shapely.MultiPolygon(parts)
+
+def prepare_geodata(data, names=(NAME_COLUMN,), label=""):
+    # Validate and normalize a freshly parsed map once, the result is what gets cached
+    report = {'invalid': 0, 'overlaps': 0, 'empty': 0, 'unnamed': 0, 'vertices': 0}
+
+    # GeoJSON is longitude/latitude by definition, anything else is reprojected to it
+    if data.crs is None:
+        data = data.set_crs(epsg=4326)
+    elif data.crs.to_epsg() != 4326:
+        data = data.to_crs(epsg=4326)
+
+    # Province names from the first filled-in field of the schema, blanks count as missing
+    name = pd.Series(np.nan, index=data.index, dtype=object)
+    for field in names:
+        if field in data.columns:
+            name = name.fillna(data[field].where(data[field].astype(str).str.strip() != ''))
+    report['unnamed'] = int(name.isna().sum())
+    data[NAME_COLUMN] = name.fillna(pd.Series([f"Province {index}" for index in data.index], index=data.index)).astype(str).str.strip()
+
+    geometries = np.asarray(data.geometry.values, dtype=object)
+
+    # Repair self-intersections and other invalid rings, keeping only the polygonal result
+    invalid = ~shapely.is_valid(geometries)
+    report['invalid'] = int(invalid.sum())
+    if invalid.any():
+        geometries[invalid] = [polygonal(geometry) for geometry in shapely.make_valid(geometries[invalid])]
+
+    # Neighbours that overlap give the shared area to the province listed first, so every point has one owner
+    tree = shapely.STRtree(geometries)
+    left, right = tree.query(geometries, predicate='overlaps')
+    later = left > right
+    left, right = left[later], right[later]
+    report['overlaps'] = len(left)
+    for position in np.unique(left):
+        earlier = shapely.union_all(geometries[right[left == position]])
+        geometries[position] = polygonal(shapely.difference(geometries[position], earlier))
+
+    # Drop repeated and collinear vertices, tolerance 0 leaves the outline exactly as it was
+    before = shapely.get_num_coordinates(geometries).sum()
+    geometries = shapely.simplify(shapely.remove_repeated_points(geometries), 0, preserve_topology=True)
+    report['vertices'] = int(before - shapely.get_num_coordinates(geometries).sum())
+
+    data = data.set_geometry(gpd.GeoSeries(geometries, index=data.index, crs=data.crs, name=data.geometry.name))
+    empty = data.geometry.isna() | data.geometry.is_empty
+    report['empty'] = int(empty.sum())
+    data = data[~empty].copy()
+
+    # Bounds and centroids, so culling and labels do not have to go back to the geometry
+    data[BOUNDS_COLUMNS] = shapely.bounds(np.asarray(data.geometry.values, dtype=object))
+    centroids = shapely.centroid(np.asarray(data.geometry.values, dtype=object))
+    data['centroid_x'] = shapely.get_x(centroids)
+    data['centroid_y'] = shapely.get_y(centroids)
+
+    data.attrs['cleanup'] = report
+    repairs = ", ".join(f"{count} {kind}" for kind, count in report.items() if count)
+    if repairs:
+        print(f"{label or 'map'}: cleaned up {repairs}")
+    return data
+
+def geometry_path(geometry):
+    # Build one compound path out of every ring of a (Multi)Polygon
+    polygons = geometry.geoms if geometry.geom_type == 'MultiPolygon' else [geometry]
+    rings = []
+    for polygon in polygons:
+        # Exteriors counter-clockwise and holes clockwise so the nonzero fill rule leaves holes empty
+        polygon = orient(polygon, 1.0)
+        rings.append(Path(np.asarray(polygon.exterior.coords)[:, :2], closed=True))
+        rings.extend(Path(np.asarray(ring.coords)[:, :2], closed=True) for ring in polygon.interiors)
+    return Path.make_compound_path(*rings)
+
+# Simplification tolerances for the level-of-detail tiers, as a fraction of the map's width
+LOD_FRACTIONS = [0.0005, 0.001, 0.002, 0.004]
+
+def simplified_tiers(data, fractions=LOD_FRACTIONS):
+    # (tolerance, geometries) pairs from full detail down to the coarsest tier
+    min_x, min_y, max_x, max_y = data.total_bounds
+    geometries = np.asarray(data.geometry.values, dtype=object)
+    tiers = [(0.0, data.geometry)]
+    for fraction in fractions:
+        tolerance = fraction * (max_x - min_x)
+        # Simplifying the provinces as one coverage keeps shared borders aligned between neighbours
+        if hasattr(shapely, 'coverage_simplify'):
+            simplified = shapely.coverage_simplify(geometries, tolerance)
+        else:
+            simplified = shapely.simplify(geometries, tolerance, preserve_topology=True)
+        tiers.append((tolerance, gpd.GeoSeries(simplified, index=data.index, crs=data.crs)))
+    return tiers
+
+def map_data_size(data, tiers):
+    # Estimated bytes of a loaded map: shapely and matplotlib copies of every tier's vertices plus the attributes
+    coordinates = sum(int(shapely.get_num_coordinates(np.asarray(geometries.values, dtype=object)).sum()) for _, geometries in tiers)
+    return 32 * coordinates + int(data.drop(columns=data.geometry.name).memory_usage(deep=True).sum())
+
+class ProvinceHitTester:
+    def __init__(self, data):
+        self.labels = data.index.to_numpy()
+
+        # Bounding-box tree over the provinces, the candidates it returns are tested exactly against the prepared polygons
+        self.geometries = np.asarray(data.geometry.values, dtype=object)
+        shapely.prepare(self.geometries)
+        self.tree = shapely.STRtree(self.geometries)
+
+        # Neighbour graph from one batch query of every province against the tree
+        self.adjacency = {label: [] for label in self.labels}
+        left, right = self.tree.query(self.geometries, predicate='intersects')
+        for a, b in zip(left, right):
+            if a != b:
+                self.adjacency[self.labels[a]].append(self.labels[b])
+
+    def locate(self, x, y):
+        # Province index containing (x, y), or None
+        point = shapely.Point(x, y)
+        candidates = self.tree.query(point)
+        matches = candidates[shapely.intersects(self.geometries[candidates], point)]
+        if len(matches) == 0:
+            return None
+        return self.labels[matches.min()]
+
+    def locate_many(self, xs, ys, missing=-1):
+        # Resolve a batch of points in one tree query, points outside every province get `missing`
+        points = shapely.points(np.asarray(xs, dtype=float), np.asarray(ys, dtype=float))
+        point_positions, tree_positions = self.tree.query(points)
+        hits = shapely.intersects(self.geometries[tree_positions], points[point_positions])
+        point_positions, tree_positions = point_positions[hits], tree_positions[hits]
+        positions = np.full(len(points), len(self.labels), dtype=np.intp)
+        # Keep the lowest province position per point, as locate() does
+        np.minimum.at(positions, point_positions, tree_positions)
+        found = positions < len(self.labels)
+        result = np.full(len(points), missing, dtype=np.result_type(self.labels.dtype, np.asarray(missing).dtype))
+        result[found] = self.labels[positions[found]]
+        return result
+
+    def neighbors(self, index):
+        # Provinces sharing a border or a corner with the given one
+        return self.adjacency[index]
+
+    def intersecting(self, geometry):
+        # Provinces touching any part of a box, lasso polygon or other shapely geometry
+        return list(self.labels[np.sort(self.tree.query(geometry, predicate='intersects'))])
+
+    def in_box(self, min_x, min_y, max_x, max_y):
+        return self.intersecting(shapely.box(min_x, min_y, max_x, max_y))
+
+    def within_distance(self, x, y, distance):
+        # Provinces with any point closer than `distance`, in map units, to (x, y)
+        return list(self.labels[np.sort(self.tree.query(shapely.Point(x, y), predicate='dwithin', distance=distance))])
+
+def metric_colors(values, cmap, norm, missing_color):
+    # Vectorized value -> RGBA mapping, provinces without a value get missing_color
+    values = np.asarray(values, dtype=float)
+    colors = cmap(norm(np.ma.masked_invalid(values)))
+    colors[np.isnan(values)] = to_rgba(missing_color)
+    return colors
+
+def load_metric_csv(path, column, key=NAME_COLUMN):
+    # One metric column of a CSV, indexed by province name for joining onto a map
+    return pd.read_csv(path).set_index(key)[column]
+
+def load_timeseries_csv(path, key=NAME_COLUMN):
+    # One row per province, every other column is a time step in playback order
+    return pd.read_csv(path).set_index(key)
+
+class FrameBuffer:
+    # RGBA frames as bytes for a window of time steps, refilled with one vectorized call when playback leaves the window
+    # The window extends in the direction playback or scrubbing is going, so stepping backwards refills as rarely as forwards
+    def __init__(self, values, cmap, norm, missing_color, size=256):
+        self.values = values  # (time steps, provinces)
+        self.cmap = cmap
+        self.norm = norm
+        self.missing_color = missing_color
+        self.size = size
+        self.start = 0
+        self.frames = np.empty((0, values.shape[1], 4), dtype=np.uint8)
+
+    def __len__(self):
+        return len(self.values)
+
+    def get(self, frame):
+        if not self.start <= frame < self.start + len(self.frames):
+            # Before the window the new one ends at the requested frame, anywhere else it starts there
+            self.start = max(0, frame - self.size + 1) if frame < self.start else frame
+            self.frames = self.colors(self.start)
+        return self.frames[frame - self.start]
+
+    def colors(self, start):
+        colors = metric_colors(self.values[start:start + self.size], self.cmap, self.norm, self.missing_color)
+        return np.round(colors * 255).astype(np.uint8)
+
+    def all_frames(self):
+        # Every frame in chunks of the buffer size, for exporting
+        for start in range(0, len(self.values), self.size):
+            yield from self.colors(start)
+
+# Agg figures of a headless render worker process, one per map, loaded on first use
+render_workers = {}
+
+def render_worker_for(geojson_path, names, style, size, dpi):
+    key = (geojson_path, tuple(names), tuple(sorted(style.items())), size, dpi)
+    if key not in render_workers:
+        data = load_geodata(geojson_path, names=names)
+        fig = Figure(figsize=size, dpi=dpi)
+        canvas = FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
+        fig.patch.set_facecolor(style['bg_color'])
+        ax.set_facecolor(style['bg_color'])
+        ax.set_axis_off()
+        renderer = ProvinceRenderer(ax, data, style['map_color'], style['border_color'], style['border_width'], simplified_tiers(data))
+        renderer.update_level_of_detail()
+        render_workers[key] = (canvas, renderer)
+    return render_workers[key]
+
+def init_render_worker(geojson_path, names, style, size, dpi):
+    # Load the map as soon as the worker process starts
+    render_worker_for(geojson_path, names, style, size, dpi)
+
+def render_frame(geojson_path, names, style, size, dpi, colors):
+    canvas, renderer = render_worker_for(geojson_path, names, style, size, dpi)
+    renderer.set_base_colors(colors)
+    canvas.draw()
+    return np.asarray(canvas.buffer_rgba()).copy()
+
+def render_image(task):
+    # One batch image: the map with optional metric colors and an optional selected province
+    geojson_path, names, style, size, dpi, colors, selection, out_path = task
+    canvas, renderer = render_worker_for(geojson_path, names, style, size, dpi)
+    if colors is None:
+        colors = np.tile(to_rgba(style['map_color']), (len(renderer.index), 1))
+    renderer.set_base_colors(colors)
+    if selection is not None:
+        renderer.highlight(selection, style['clicked_color'])
+    try:
+        canvas.figure.savefig(out_path, facecolor=style['bg_color'])
+    finally:
+        if selection is not None:
+            renderer.clear_highlight(selection)
+    return out_path
+
+def render_batch(out_dir, maps, snapshots=None, image_format="png", workers=None, cmap='viridis', size=(12, 8), dpi=100):
+    # Headless export of every province selection, or of every snapshot column, for each manifest entry in `maps`
+    tasks = []
+    for entry in maps:
+        style = map_style(entry['map_color'], entry['bg_color'])
+        data = load_geodata(entry['geojson'], names=entry['names'])
+        map_dir = os.path.join(out_dir, entry['name'])
+        os.makedirs(map_dir, exist_ok=True)
+        if snapshots is None:
+            for index, name in data[NAME_COLUMN].items():
+                out_path = os.path.join(map_dir, f"{index:03d}_{safe_file_name(name)}.{image_format}")
+                tasks.append((entry['geojson'], entry['names'], style, size, dpi, None, index, out_path))
+        else:
+            # Every snapshot of a map shares one color scale
+            values = snapshots.reindex(data[NAME_COLUMN]).to_numpy(dtype=float).T
+            norm = Normalize()
+            norm.autoscale_None(np.ma.masked_invalid(values))
+            frames = metric_colors(values, matplotlib.colormaps.get_cmap(cmap), norm, entry['map_color'])
+            for column, colors in zip(snapshots.columns, frames):
+                out_path = os.path.join(map_dir, f"{safe_file_name(column)}.{image_format}")
+                tasks.append((entry['geojson'], entry['names'], style, size, dpi, colors, None, out_path))
+
+    # Tasks are grouped by map, so chunks mostly hit a map the worker has already loaded
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, len(tasks) // (workers * 4))
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for _ in pool.map(render_image, tasks, chunksize=chunksize):
+            pass
+    elapsed = time.perf_counter() - start
+    print(f"Rendered {len(tasks)} images with {workers} worker(s) in {elapsed:.1f} s, {len(tasks) / elapsed:.1f} images/s")
+    return len(tasks) / elapsed
+
+def safe_file_name(name):
+    return re.sub(r"[^\w-]+", "_", str(name)).strip("_") or "unnamed"
+
+def export_animation(geojson_path, names, frames, out_path, style, fps=10, workers=None, size=(8, 6), dpi=100, mp_context=None):
+    # Render RGBA province colors to a GIF, or to a video through ffmpeg, with frames drawn in a process pool
+    # The workers get the map's name schema with the path, spawned ones don't see the app's manifest
+    frame_ms = 1000 / fps
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context, initializer=init_render_worker, initargs=(geojson_path, names, style, size, dpi)) as pool:
+        images = pool.map(functools.partial(render_frame, geojson_path, names, style, size, dpi), frames, chunksize=8)
+        if out_path.lower().endswith(".gif"):
+            # GIF frames are held in memory until the end, as palette images
+            gif_frames = [Image.fromarray(image).convert('RGB').quantize(256) for image in images]
+            gif_frames[0].save(out_path, save_all=True, append_images=gif_frames[1:], duration=frame_ms, loop=0)
+            return len(gif_frames)
+
+        ffmpeg = shutil.which("ffmpeg")
+        if ffmpeg is None:
+            raise RuntimeError("ffmpeg is needed to export video, use a .gif file name instead")
+        count = 0
+        encoder = None
+        try:
+            for image in images:
+                if encoder is None:
+                    height, width = image.shape[:2]
+                    encoder = subprocess.Popen([ffmpeg, "-y", "-loglevel", "error", "-f", "rawvideo", "-pix_fmt", "rgba", "-s", f"{width}x{height}", "-r", str(fps), "-i", "-",
+                                                "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2", "-pix_fmt", "yuv420p", out_path], stdin=subprocess.PIPE)
+                encoder.stdin.write(image.tobytes())
+                count += 1
+        finally:
+            if encoder is not None:
+                encoder.stdin.close()
+                encoder.wait()
+        return count
+
+class ProvinceRenderer:
+    BASE_RASTERS = 3  # Cached base layer frames kept per renderer, a few window sizes and views
+
+    def __init__(self, ax, data, face_color, edge_color, line_width, tiers=None, hover_color='white', layered=False):
+        self.ax = ax
+        self.face_color = face_color
+
+        # Layered renderers keep highlights off the province patches, the base layer under them is cached as a raster
+        self.layered = layered
+        self.highlight_patches = {}
+        self.base_rasters = OrderedDict()
+        self.base_version = 0
+
+        # Fill of every province in data order, and the provinces currently drawn in a highlight color
+        self.index = data.index
+        self.position = {index: position for position, index in enumerate(data.index)}
+        self.base_colors = np.tile(to_rgba(face_color), (len(data.index), 1))
+        self.highlights = {}
+
+        # Level-of-detail tiers, finest first, their paths are built the first time a tier is drawn
+        self.tiers = tiers or [(0.0, data.geometry)]
+        self.tier_paths = {}
+        self.level = 0
+
+        # One patch per province, built once and kept for the lifetime of the tab
+        self.artists = {}
+        for index, path in self.paths_for(0).items():
+            artist = PathPatch(path, facecolor=face_color, edgecolor=edge_color, linewidth=line_width)
+            self.ax.add_patch(artist)
+            self.artists[index] = artist
+
+        # Province bounds, in artist order, for viewport culling
+        if set(BOUNDS_COLUMNS) <= set(data.columns):
+            self.bounds = data.loc[list(self.artists), BOUNDS_COLUMNS].to_numpy()
+        else:
+            self.bounds = data.geometry.loc[list(self.artists)].bounds.to_numpy()
+
+        # Same framing geopandas uses for geographic coordinates
+        self.ax.autoscale_view()
+        if data.crs is not None and data.crs.is_geographic:
+            y_mid = (data.total_bounds[1] + data.total_bounds[3]) / 2
+            self.ax.set_aspect(1 / np.cos(np.radians(y_mid)))
+        else:
+            self.ax.set_aspect('equal')
+
+        # Outline of the hovered province, left out of full draws and blitted on its own
+        self.hover_index = None
+        self.overlay = PathPatch(Path(np.zeros((1, 2))), facecolor='none', edgecolor=hover_color, linewidth=line_width * 3, animated=True, visible=False)
+        self.ax.add_artist(self.overlay)
+
+        # Frame without the overlay, taken after every full draw
+        self.background = None
+        self.draw_callback = self.ax.figure.canvas.mpl_connect('draw_event', self.on_draw)
+
+        # Zooming changes how much detail is visible and which provinces are on screen
+        self.ax.callbacks.connect('xlim_changed', lambda ax: self.update_level_of_detail())
+        self.ax.callbacks.connect('xlim_changed', lambda ax: self.cull())
+        self.ax.callbacks.connect('ylim_changed', lambda ax: self.cull())
+
+    def on_draw(self, event):
+        # Saving to a vector format draws through a temporary canvas, there is nothing to snapshot then
+        if event.canvas is not self.ax.figure.canvas or not event.canvas.supports_blit:
+            return
+        # Axes hidden behind another tab of a shared figure are not in the frame
+        if not self.ax.get_visible():
+            return
+        if self.layered:
+            # Everything drawn so far is the base layer, keep it for later frames at this size and view
+            self.base_rasters[self.base_key()] = event.canvas.copy_from_bbox(self.ax.figure.bbox)
+            self.base_rasters.move_to_end(self.base_key())
+            while len(self.base_rasters) > self.BASE_RASTERS:
+                self.base_rasters.popitem(last=False)
+            self.draw_highlights()
+        self.background = event.canvas.copy_from_bbox(self.ax.bbox)
+        # The canvas pushes the whole frame right after this, overlay included
+        if self.overlay.get_visible():
+            self.ax.draw_artist(self.overlay)
+
+    def base_key(self):
+        # Everything the base layer's pixels depend on: canvas size and DPI, view, detail level, fill colors and background
+        figure = self.ax.figure
+        return (tuple(figure.bbox.size), figure.dpi, tuple(self.ax.get_xlim()), tuple(self.ax.get_ylim()),
+                self.level, self.base_version, to_rgba(figure.get_facecolor()))
+
+    def draw_highlights(self):
+        for patch in self.highlight_patches.values():
+            self.ax.draw_artist(patch)
+
+    def composite(self):
+        # Put the frame together from the cached base layer, highlights and overlay; False when there is no raster for it
+        base = self.base_rasters.get(self.base_key()) if self.layered else None
+        if base is None:
+            return False
+        with TRACER.span('composite'):
+            canvas = self.ax.figure.canvas
+            self.base_rasters.move_to_end(self.base_key())
+            canvas.restore_region(base)
+            self.draw_highlights()
+            self.background = canvas.copy_from_bbox(self.ax.bbox)
+            if self.overlay.get_visible():
+                self.ax.draw_artist(self.overlay)
+        return True
+
+    def cached_bytes(self):
+        return sum(4 * int(key[0][0]) * int(key[0][1]) for key in self.base_rasters)
+
+    def cull(self):
+        # Hide provinces whose bounds fall completely outside the view
+        x0, x1 = sorted(self.ax.get_xlim())
+        y0, y1 = sorted(self.ax.get_ylim())
+        visible = (self.bounds[:, 0] <= x1) & (self.bounds[:, 2] >= x0) & (self.bounds[:, 1] <= y1) & (self.bounds[:, 3] >= y0)
+        for artist, shown in zip(self.artists.values(), visible):
+            if artist.get_visible() != shown:
+                artist.set_visible(shown)
+
+    def paths_for(self, level):
+        if level not in self.tier_paths:
+            paths = {}
+            for index, geometry in self.tiers[level][1].items():
+                if geometry is None or geometry.is_empty:
+                    continue
+                paths[index] = geometry_path(geometry)
+            self.tier_paths[level] = paths
+        return self.tier_paths[level]
+
+    def set_level(self, level):
+        if level == self.level:
+            return
+        self.level = level
+        paths = self.paths_for(level)
+        full_paths = self.paths_for(0)
+        for index, artist in self.artists.items():
+            artist.set_path(paths.get(index, full_paths[index]))
+        for index, patch in self.highlight_patches.items():
+            patch.set_path(self.artists[index].get_path())
+        if self.hover_index is not None:
+            self.overlay.set_path(self.artists[self.hover_index].get_path())
+
+    def update_level_of_detail(self):
+        # Coarsest tier whose tolerance is still below one screen pixel, taking the canvas DPI into account
+        pixel_size = self.ax.viewLim.width / max(self.ax.bbox.width, 1)
+        level = 0
+        for tier, (tolerance, _) in enumerate(self.tiers):
+            if tolerance <= pixel_size:
+                level = tier
+        self.set_level(level)
+
+    def highlight(self, index, color):
+        self.highlights[index] = color
+        if not self.layered:
+            self.artists[index].set_facecolor(color)
+            return
+        # A copy of the province drawn over the base layer, which keeps its own colors
+        patch = self.highlight_patches.get(index)
+        if patch is None:
+            artist = self.artists[index]
+            patch = PathPatch(artist.get_path(), edgecolor=artist.get_edgecolor(), linewidth=artist.get_linewidth(), animated=True)
+            self.ax.add_artist(patch)
+            self.highlight_patches[index] = patch
+        patch.set_facecolor(color)
+
+    def clear_highlight(self, index):
+        self.highlights.pop(index, None)
+        if not self.layered:
+            self.artists[index].set_facecolor(self.base_colors[self.position[index]])
+            return
+        patch = self.highlight_patches.pop(index, None)
+        if patch is not None:
+            patch.remove()
+
+    def set_base_colors(self, colors):
+        # Recolor every province from an (N, 4) RGBA array in data order, geometry is left untouched
+        # Floats in 0-1 or bytes in 0-255, as stored by FrameBuffer
+        colors = np.asarray(colors)
+        self.base_colors = colors / 255 if colors.dtype == np.uint8 else colors.astype(float)
+        self.base_version += 1
+        for index, artist in self.artists.items():
+            if self.layered or index not in self.highlights:
+                artist.set_facecolor(self.base_colors[self.position[index]])
+
+    def set_shown(self, shown):
+        # Tabs sharing a figure hide their axes while another tab is on screen, the last frame is useless then
+        self.ax.set_visible(shown)
+        if not shown:
+            self.background = None
+
+    def disconnect(self):
+        # Stop listening to a shared canvas before the axes are removed from its figure
+        self.ax.figure.canvas.mpl_disconnect(self.draw_callback)
+
+    def repaint(self, indices):
+        canvas = self.ax.figure.canvas
+        artists = [self.artists[index] for index in indices if index in self.artists]
+        # Hidden axes keep the new colors for their next full draw
+        if not artists or not self.ax.get_visible():
+            return
+
+        # Blitting needs a frame from a previous full draw
+        if not canvas.supports_blit or self.background is None:
+            canvas.draw_idle()
+            return
+
+        # Highlights go over the cached base layer, no province underneath is drawn again
+        if self.layered:
+            base = self.base_rasters.get(self.base_key())
+            if base is None:
+                canvas.draw_idle()
+                return
+            with TRACER.span('repaint'):
+                canvas.restore_region(base)
+                self.draw_highlights()
+                self.background = canvas.copy_from_bbox(self.ax.bbox)
+                self.blit_overlay([artist.get_window_extent() for artist in artists])
+            return
+
+        # Draw only the changed patches over the last frame, under the overlay
+        with TRACER.span('repaint'):
+            canvas.restore_region(self.background)
+            for artist in artists:
+                self.ax.draw_artist(artist)
+            self.background = canvas.copy_from_bbox(self.ax.bbox)
+            self.blit_overlay([artist.get_window_extent() for artist in artists])
+
+    def set_hover(self, index):
+        # Returns whether the hovered province changed
+        if index == self.hover_index:
+            return False
+        changed = [self.overlay.get_window_extent()] if self.overlay.get_visible() else []
+        self.hover_index = index
+        if index in self.artists:
+            self.overlay.set_path(self.artists[index].get_path())
+            self.overlay.set_visible(True)
+        else:
+            self.overlay.set_visible(False)
+
+        canvas = self.ax.figure.canvas
+        if canvas.supports_blit and self.background is not None:
+            with TRACER.span('overlay'):
+                canvas.restore_region(self.background)
+                self.blit_overlay(changed)
+        return True
+
+    def draw_transient(self, artists):
+        # Draw short-lived artists, like a selection rubber band, over the last frame and the overlay
+        canvas = self.ax.figure.canvas
+        if not canvas.supports_blit or self.background is None:
+            return
+        canvas.restore_region(self.background)
+        if self.overlay.get_visible():
+            self.ax.draw_artist(self.overlay)
+        for artist in artists:
+            self.ax.draw_artist(artist)
+        canvas.blit(self.ax.bbox)
+
+    def blit_overlay(self, bboxes):
+        # Draw the overlay on the current frame and push only the area that changed
+        if self.overlay.get_visible():
+            self.ax.draw_artist(self.overlay)
+            bboxes = bboxes + [self.overlay.get_window_extent()]
+        if not bboxes:
+            return
+        bbox = Bbox.intersection(Bbox.union(bboxes).padded(self.overlay.get_linewidth() + 2), self.ax.bbox)
+        if bbox is not None:
+            self.ax.figure.canvas.blit(bbox)
+
+class MotionThrottle:
+    # Coalesces bursts of motion events so only the latest position is handled, at most once per interval
+    def __init__(self, schedule, interval_ms, handler, clock=time.perf_counter):
+        self.schedule = schedule
+        self.interval_ms = interval_ms
+        self.handler = handler
+        self.clock = clock
+        self.pending = None
+        self.job = None
+        self.last_run = float('-inf')
+
+    def push(self, *args):
+        self.pending = args
+        if self.job is None:
+            # After a quiet spell the next event goes through on the next loop iteration
+            elapsed_ms = 1000 * (self.clock() - self.last_run)
+            self.job = self.schedule(int(max(0, self.interval_ms - elapsed_ms)), self.flush)
+
+    def flush(self):
+        self.job = None
+        self.last_run = self.clock()
+        args, self.pending = self.pending, None
+        if args is not None:
+            self.handler(*args)
+
+def page_url(title):
+    return f"https://en.wikipedia.org/wiki/{title.replace(' ', '_')}"
+
+def fetch_page(url, timeout=10):
+    # Default fetcher, DetailLoader takes any callable from url to HTML text
+    request = urllib.request.Request(url, headers={'User-Agent': "Interactive-Map-using-Tkinter"})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return response.read().decode(response.headers.get_content_charset() or 'utf-8', errors='replace')
+
+class PageCache:
+    def __init__(self, directory=PAGE_CACHE_DIR, max_entries=64, max_bytes=50 * 1024 * 1024, ttl=24 * 60 * 60):
+        self.directory = directory
+        self.max_entries = max_entries  # Pages kept in memory
+        self.max_bytes = max_bytes  # Size budget on disk
+        self.ttl = ttl  # Seconds before a page is fetched again
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+
+    def path_for(self, url):
+        return os.path.join(self.directory, hashlib.sha1(url.encode()).hexdigest() + ".html")
+
+    def get(self, url, promote=True):
+        # Speculative reads pass promote=False, a page found then keeps its place and is not copied from disk into memory
+        now = time.time()
+        with self.lock:
+            if url in self.memory:
+                stored, html = self.memory[url]
+                if now - stored < self.ttl:
+                    if promote:
+                        self.memory.move_to_end(url)
+                    return html
+                del self.memory[url]
+
+        if self.directory is None:
+            return None
+        path = self.path_for(url)
+        try:
+            stored = os.path.getmtime(path)
+            if now - stored >= self.ttl:
+                os.remove(path)
+                return None
+            with open(path, encoding='utf-8') as f:
+                html = f.read()
+        except OSError:
+            return None
+        if promote:
+            self.remember(url, stored, html)
+        return html
+
+    def put(self, url, html):
+        self.remember(url, time.time(), html)
+        if self.directory is None:
+            return
+        # The disk copy is best-effort, the page is already in memory and the fetch counts as done
+        path = self.path_for(url)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                f.write(html)
+            os.replace(temp_path, path)
+            self.evict()
+        except OSError:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+    def remember(self, url, stored, html):
+        with self.lock:
+            self.memory[url] = (stored, html)
+            self.memory.move_to_end(url)
+            while len(self.memory) > self.max_entries:
+                self.memory.popitem(last=False)
+
+    def evict(self):
+        # Drop the oldest pages on disk until the cache fits its size budget
+        with self.lock:
+            entries = []
+            for name in os.listdir(self.directory):
+                if name.endswith(".html"):
+                    try:
+                        stat = os.stat(os.path.join(self.directory, name))
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, name))
+            total = sum(size for _, size, _ in entries)
+            for _, size, name in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+                total -= size
+
+class DetailLoader:
+    # Fetches detail pages on worker threads, results come back as futures
+    def __init__(self, fetcher=fetch_page, cache=None, workers=4):
+        self.fetcher = fetcher
+        self.cache = cache if cache is not None else PageCache()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="details")
+        self.inflight = {}
+        self.lock = threading.Lock()
+
+        # How pages the user opened were served: from the cache, by joining a running fetch, or fetched from scratch
+        self.stats = {'hits': 0, 'in_flight': 0, 'misses': 0}
+
+    def load(self, url):
+        html = self.cache.get(url)
+        if html is not None:
+            self.count('hits')
+            future = Future()
+            future.set_result(html)
+            return future
+
+        # A page that is already being fetched is not requested twice
+        with self.lock:
+            future = self.inflight.get(url)
+            if future is None:
+                future = self.executor.submit(self.fetch, url)
+                self.inflight[url] = future
+                outcome = 'misses'
+            else:
+                outcome = 'in_flight'
+        self.count(outcome)
+        return future
+
+    def prefetch(self, url):
+        # Speculative loads from the prefetcher: the cache check runs on a worker too, the caller never touches the disk
+        # The returned future always finishes on a worker thread, and these loads are left out of the stats
+        with self.lock:
+            future = self.inflight.get(url)
+            if future is None:
+                future = self.executor.submit(self.fetch, url, True)
+                self.inflight[url] = future
+        return future
+
+    def count(self, outcome):
+        with self.lock:
+            self.stats[outcome] += 1
+
+    def fetch(self, url, speculative=False):
+        try:
+            html = self.cache.get(url, promote=False) if speculative else None
+            if html is None:
+                with TRACER.span('fetch'):
+                    html = self.fetcher(url)
+                self.cache.put(url, html)
+            return html
+        finally:
+            with self.lock:
+                self.inflight.pop(url, None)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+class DetailPrefetcher:
+    # Warms the page cache for the visible map, hovered provinces and their neighbours first
+    HOVERED, NEIGHBOR, BACKGROUND = 0, 1, 2
+
+    def __init__(self, loader, concurrency=2):
+        self.loader = loader
+        self.concurrency = concurrency  # Fetches running at once, the rest of the loader's workers stay free for clicks
+        self.queue = []
+        self.queued = {}
+        self.order = itertools.count()
+        self.active = 0
+        self.prefetched = 0
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    def start(self, titles):
+        # A new map replaces whatever was still queued for the previous one
+        self.cancel()
+        self.add(titles, self.BACKGROUND)
+
+    def cancel(self):
+        with self.lock:
+            self.queue.clear()
+            self.queued.clear()
+
+    def add(self, titles, priority):
+        with self.lock:
+            for title in titles:
+                url = page_url(title)
+                if self.queued.get(url, priority + 1) <= priority:
+                    continue
+                # Raising the priority leaves the old heap entry behind, pump() skips it
+                self.queued[url] = priority
+                heapq.heappush(self.queue, (priority, next(self.order), url))
+        self.pump()
+
+    def pump(self):
+        # A load that finishes before its callback is attached calls done() right here, the loop picks up the freed slot
+        # instead of pump() recursing once per cached page
+        if getattr(self.local, 'pumping', False):
+            return
+        self.local.pumping = True
+        try:
+            while True:
+                urls = []
+                with self.lock:
+                    while self.active < self.concurrency and self.queue:
+                        priority, _, url = heapq.heappop(self.queue)
+                        if self.queued.get(url) != priority:
+                            continue
+                        del self.queued[url]
+                        self.active += 1
+                        urls.append(url)
+                if not urls:
+                    return
+
+                for url in urls:
+                    try:
+                        future = self.loader.prefetch(url)
+                    except RuntimeError:
+                        # The loader has been shut down
+                        return
+                    future.add_done_callback(self.done)
+        finally:
+            self.local.pumping = False
+
+    def done(self, future):
+        with self.lock:
+            self.active -= 1
+            if not future.cancelled() and future.exception() is None:
+                self.prefetched += 1
+        self.pump()
+
+class WikipediaViewer(tk.Toplevel):
+    POLL_MS = 50  # How often the Tk thread checks for a finished fetch
+
+    def __init__(self, master, loader):
+        super().__init__(master)
+        self.title("Details")
+        self.loader = loader
+        self.url = None
+        self.future = None
+
+        # Make the window maximized
+        self.maximize_window()
+
+        # Create and pack HtmlFrame for web content
+        self.html_frame = HtmlFrame(self, horizontal_scrollbar="auto", vertical_scrollbar="auto")
+        self.html_frame.pack(fill="both", expand=True, padx=10, pady=10)
+
+        # The window is reused for every page, closing it only hides it
+        self.protocol("WM_DELETE_WINDOW", self.withdraw)
+
+    def open(self, title):
+        self.title(f"Details - {title}")
+        self.deiconify()
+        self.lift()
+
+        # Load the Wikipedia page in the background, the map stays responsive meanwhile
+        self.url = page_url(title)
+        self.future = self.loader.load(self.url)
+        if self.future.done():
+            self.show_result()
+        else:
+            self.html_frame.load_html(f"<p>Loading {title}...</p>")
+            self.after(self.POLL_MS, self.check_future)
+
+    def check_future(self):
+        # Results are only touched from the Tk thread
+        if self.future is None:
+            return
+        if self.future.done():
+            self.show_result()
+        else:
+            self.after(self.POLL_MS, self.check_future)
+
+    def show_result(self):
+        future, self.future = self.future, None
+        try:
+            with TRACER.span('page_render'):
+                self.html_frame.load_html(future.result(), base_url=self.url)
+        except Exception as error:
+            self.html_frame.load_html(f"<p>Could not load {self.url}: {error}</p>")
+
+    def maximize_window(self):
+        # Get screen dimensions
+        width = self.winfo_screenwidth()
+        height = self.winfo_screenheight()
+        # Set window size to screen dimensions
+        self.geometry(f"{width}x{height}+0+0")
+
+class PlaybackControls(tk.Frame):
+    # Play, pause and scrub through a MapTab's time series, frames are scheduled with after()
+    def __init__(self, tab, timestamps, fps):
+        super().__init__(tab)
+        self.tab = tab
+        self.timestamps = timestamps
+        self.fps = fps
+        self.frame = 0
+        self.job = None
+        self.export_thread = None
+
+        self.play_button = tk.Button(self, text="Play", width=6, command=self.toggle)
+        self.play_button.pack(side=tk.LEFT, padx=5)
+        self.scale = tk.Scale(self, from_=0, to=len(timestamps) - 1, orient=tk.HORIZONTAL, showvalue=False, command=self.on_scrub)
+        self.scale.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self.time_label = tk.Label(self, text=timestamps[0], width=20, font=('Helvetica', 12))
+        self.time_label.pack(side=tk.LEFT)
+        self.export_button = tk.Button(self, text="Export", command=self.export)
+        self.export_button.pack(side=tk.LEFT, padx=5)
+
+    def toggle(self):
+        if self.job is None:
+            self.play()
+        else:
+            self.pause()
+
+    def play(self):
+        self.play_button.config(text="Pause")
+        self.job = self.after(int(1000 / self.fps), self.step)
+
+    def pause(self):
+        if self.job is not None:
+            self.after_cancel(self.job)
+            self.job = None
+        self.play_button.config(text="Play")
+
+    def step(self):
+        # Schedule the next frame first so a slow draw delays playback instead of stacking callbacks
+        self.job = self.after(int(1000 / self.fps), self.step)
+        self.show((self.frame + 1) % len(self.timestamps))
+
+    def on_scrub(self, value):
+        if int(value) != self.frame:
+            self.show(int(value))
+
+    def show(self, frame):
+        self.frame = frame
+        self.scale.set(frame)
+        self.time_label.config(text=self.timestamps[frame])
+        self.tab.show_frame(frame)
+
+    def export(self):
+        out_path = filedialog.asksaveasfilename(parent=self, defaultextension=".gif", filetypes=[("GIF", "*.gif"), ("MP4 video", "*.mp4")])
+        if not out_path or self.export_thread is not None:
+            return
+
+        # Rendering happens in worker processes, this thread only waits for them
+        # The workers are spawned, forking from a thread of the running app would copy Tk and the other pools' locks mid-use
+        self.export_button.config(text="Exporting...", state=tk.DISABLED)
+        self.export_error = None
+        def run():
+            try:
+                export_animation(self.tab.geojson_path, self.tab.names, self.tab.frames.all_frames(), out_path, self.tab.style(), self.fps,
+                                 mp_context=multiprocessing.get_context('spawn'))
+            except Exception as error:
+                self.export_error = error
+        self.export_thread = threading.Thread(target=run, daemon=True)
+        self.export_thread.start()
+        self.after(200, self.check_export)
+
+    def check_export(self):
+        if self.export_thread.is_alive():
+            self.after(200, self.check_export)
+            return
+        self.export_thread = None
+        self.export_button.config(text="Export", state=tk.NORMAL)
+        if self.export_error is not None:
+            self.tab.status.config(text=f"Export failed: {self.export_error}")
+
+    def destroy(self):
+        self.pause()
+        super().destroy()
+
+ZOOM_STEP = 1.25  # Zoom factor per mouse-wheel notch
+MAX_ZOOM = 200  # Deepest zoom, relative to the whole map
+DRAG_THRESHOLD = 5  # Pixels the mouse must move before a press becomes a pan
+HOVER_INTERVAL_MS = 16  # At most one hover update per frame at 60 Hz
+
+# Flag size in logical pixels, and the fractions of it used when the tab is too narrow for the full size
+FLAG_SIZE = (200, 120)
+FLAG_STEPS = [0.5, 0.75, 1.0]
+
+def screen_scale(widget):
+    # Device pixels per logical pixel, 1 on a 96 DPI screen and 2 on most HiDPI ones
+    return widget.winfo_fpixels('1i') / 96
+
+def scaled_size(size, scale):
+    return (max(1, round(size[0] * scale)), max(1, round(size[1] * scale)))
+
+class AssetCache:
+    # Images decoded and resized once per pixel size on worker threads, kept in memory and as PNGs on disk
+    def __init__(self, directory=ASSET_CACHE_DIR, workers=2, max_entries=256):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="assets")
+        self.lock = threading.Lock()
+        self.images = OrderedDict()  # (path, size) -> future of the resized PIL image
+        self.photos = OrderedDict()  # (path, size) -> Tk image, only touched from the Tk thread
+
+        # Where finished images came from: already in memory, a resized PNG on disk, or decoded from the source
+        self.stats = {'memory': 0, 'disk': 0, 'decoded': 0}
+
+    def load(self, path, size):
+        # Future of the image at `size` pixels, requests for an image that is already loading share its future
+        key = (os.path.abspath(path), tuple(size))
+        with self.lock:
+            future = self.images.get(key)
+            if future is not None:
+                self.images.move_to_end(key)
+                if future.done():
+                    self.stats['memory'] += 1
+                return future
+            future = self.executor.submit(self.decode, *key)
+            self.images[key] = future
+            while len(self.images) > self.max_entries:
+                self.images.popitem(last=False)
+        return future
+
+    def decode(self, path, size):
+        with TRACER.span('asset'):
+            return self.decode_image(path, size)
+
+    def decode_image(self, path, size):
+        # The disk entry is keyed on the source's mtime and size, so an edited image is resized again
+        stat = os.stat(path)
+        name = hashlib.sha1(f"{path}|{stat.st_mtime_ns}|{stat.st_size}|{size[0]}x{size[1]}".encode()).hexdigest()
+        cache_path = os.path.join(self.directory, f"{name}.png")
+        try:
+            image = Image.open(cache_path)
+            image.load()
+            with self.lock:
+                self.stats['disk'] += 1
+            return image
+        except (OSError, ValueError):
+            pass
+
+        with Image.open(path) as source:
+            if source.mode not in ('RGB', 'RGBA'):
+                source = source.convert('RGBA')
+            image = source.resize(size, Image.LANCZOS)
+        # The disk copy only saves the resize next time, an unwritable cache still shows the image
+        temp_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            image.save(temp_path, format='PNG')
+            os.replace(temp_path, cache_path)
+        except OSError:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+        with self.lock:
+            self.stats['decoded'] += 1
+        return image
+
+    def photo(self, path, size):
+        # Tk image of a finished load, or None while it is still decoding; Tk thread only
+        key = (os.path.abspath(path), tuple(size))
+        photo = self.photos.get(key)
+        if photo is None:
+            future = self.load(path, size)
+            if not future.done():
+                return None
+            photo = ImageTk.PhotoImage(future.result())
+            self.photos[key] = photo
+            while len(self.photos) > self.max_entries:
+                self.photos.popitem(last=False)
+        self.photos.move_to_end(key)
+        return photo
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+RESIZE_SETTLE_MS = 150  # Quiet time after the last resize step before the map is drawn at the new size
+
+class MapFigureCanvas(FigureCanvasTkAgg):
+    # Tk canvas of the shared map figure
+    # Full draws are first offered to `composite`, which rebuilds the frame from cached layers when nothing under them changed
+    # While the window is being resized the last frame is shown stretched to fit, the map is drawn once the size settles
+    def __init__(self, figure, master):
+        super().__init__(figure, master=master)
+        self.composite = None
+        self.drawn = False
+        self.resize_event = None
+        self.resize_job = None
+        self.preview = None
+        self.preview_item = None
+
+    def draw(self):
+        if self.composite is not None and self.composite():
+            self.blit()
+        else:
+            super().draw()
+        self.drawn = True
+
+    def resize(self, event):
+        # Nothing to stretch before the first frame
+        if not self.drawn:
+            super().resize(event)
+            return
+        widget = self.get_tk_widget()
+        self.resize_event = event
+        self.show_preview(event.width, event.height)
+        if self.resize_job is not None:
+            widget.after_cancel(self.resize_job)
+        self.resize_job = widget.after(RESIZE_SETTLE_MS, self.finish_resize)
+
+    def show_preview(self, width, height):
+        # The last frame scaled to the new size, cheap enough to follow every step of a resize drag
+        if width <= 0 or height <= 0:
+            return
+        with TRACER.span('resize_preview'):
+            frame = Image.fromarray(np.asarray(self.buffer_rgba()))
+            self.preview = ImageTk.PhotoImage(frame.resize((width, height), Image.NEAREST), master=self.get_tk_widget())
+            widget = self.get_tk_widget()
+            if self.preview_item is None:
+                self.preview_item = widget.create_image(0, 0, anchor='nw', image=self.preview)
+            else:
+                widget.itemconfigure(self.preview_item, image=self.preview)
+            widget.tag_raise(self.preview_item)
+
+    def finish_resize(self):
+        # One real resize and draw at the final size, the preview stays on top until that frame is in
+        self.resize_job = None
+        event, self.resize_event = self.resize_event, None
+        super().resize(event)
+        widget = self.get_tk_widget()
+        if self.preview_item is not None:
+            widget.tag_raise(self.preview_item)
+        widget.after_idle(self.drop_preview)
+
+    def drop_preview(self):
+        if self.resize_job is None and self.preview_item is not None:
+            self.get_tk_widget().delete(self.preview_item)
+            self.preview_item = None
+            self.preview = None
+
+class MapCanvas:
+    # One figure and Tk canvas for every tab of a window, each tab keeps its own axes and shows them while selected
+    EVENTS = ['button_press_event', 'motion_notify_event', 'button_release_event', 'scroll_event', 'axes_leave_event', 'resize_event']
+
+    def __init__(self, master):
+        self.figure = Figure()
+        self.canvas = MapFigureCanvas(self.figure, master=master)
+        self.canvas.composite = self.composite
+        self.widget = self.canvas.get_tk_widget()
+        self.active = None
+        if TRACER.enabled:
+            self.canvas.draw = TRACER.wrap('draw', self.canvas.draw)
+
+        # Mouse events go to whichever tab is on screen
+        for name in self.EVENTS:
+            self.canvas.mpl_connect(name, functools.partial(self.dispatch, name))
+
+    def dispatch(self, name, event):
+        if self.active is not None:
+            self.active.handlers[name](event)
+
+    def composite(self):
+        # Tab switches and repeated sizes reuse the shown tab's cached base layer instead of drawing every province
+        return self.active is not None and self.active.built and self.active.renderer.composite()
+
+    def add_axes(self):
+        # New axes for a tab, hidden until the tab is shown
+        ax = self.figure.add_subplot()
+        ax.set_visible(False)
+        return ax
+
+    def show(self, tab):
+        if tab is self.active:
+            return
+        if self.active is not None and self.active.built:
+            self.active.renderer.set_shown(False)
+        self.active = tab
+        tab.renderer.set_shown(True)
+        self.figure.patch.set_facecolor(tab.bg_color)
+
+        # The widget belongs to the notebook, so it can be packed into any of its tabs
+        self.widget.pack(in_=tab, fill=tk.BOTH, expand=1)
+        self.widget.lift()
+        tab.lift_overlays()
+        tab.renderer.update_level_of_detail()
+        self.canvas.draw_idle()
+
+    def remove(self, tab):
+        # Take an unloaded tab's axes out of the figure
+        if tab is self.active:
+            self.active = None
+            self.widget.pack_forget()
+        tab.renderer.disconnect()
+        tab.ax.remove()
+
+ASSET_POLL_MS = 20  # How often a tab checks for its decoded flag
+
+def build_map_view(ax, data, map_color, bg_color, border_color=BORDER_COLOR, border_width=BORDER_WIDTH):
+    # The part of a tab's map that needs no Tk: the provinces on `ax`, the spatial index and the full view
+    # MapTab builds its map here, and the benchmarks measure the same code headless
+    ax.set_facecolor(bg_color)  # Background color for axis
+
+    # Plot every province once, later clicks only recolor the affected patches
+    # Simplified copies are drawn when the full detail would be finer than a pixel
+    renderer = ProvinceRenderer(ax, data, map_color, border_color, border_width, simplified_tiers(data), layered=True)
+
+    # Spatial index for finding the clicked province
+    hit_tester = ProvinceHitTester(data)
+
+    # Remove axis labels and ticks
+    ax.set_axis_off()
+
+    # Full view of the map, zooming out stops here
+    return renderer, hit_tester, (ax.get_xlim(), ax.get_ylim())
+
+def change_selection(renderer, selected, provinces, color):
+    # Revert the provinces that left the selection, highlight the new ones and repaint only the provinces whose color changed
+    for index in selected - provinces:
+        renderer.clear_highlight(index)
+    for index in provinces - selected:
+        renderer.highlight(index, color)
+    changed = selected ^ provinces
+    renderer.repaint(changed)
+    return changed
+
+class MapTab(tk.Frame):
+    def __init__(self, parent, geojson_path, title, map_color, bg_color, flag_image_path, *args, names=(NAME_COLUMN,), metric=None, cmap='viridis', timeseries=None, fps=10, map_canvas=None, assets=None, **kwargs):
+        super().__init__(parent, *args, **kwargs)
+        self.geojson_path = geojson_path
+        # Fields holding the province names, from the manifest
+        self.names = names
+        self.title = title
+        self.map_color = map_color
+        self.bg_color = bg_color
+        self.flag_image_path = flag_image_path
+
+        # Optional choropleth shown once the map is built, see set_metric
+        self.metric = metric
+        self.cmap = cmap
+        self.metric_cmap = None
+        self.metric_norm = None
+
+        # Optional time-series playback, see set_timeseries
+        self.timeseries = timeseries
+        self.fps = fps
+        self.frames = None
+        self.playback = None
+
+        self.current_province = None
+        self.selected = set()  # Every highlighted province, shift-click and drag selections add to it
+        self.default_color = map_color  # Default color
+        self.clicked_color = CLICKED_COLOR  # Color for clicked province
+        self.border_color = BORDER_COLOR  # Border color
+        self.border_width = BORDER_WIDTH  # Border width
+
+        # Figure and canvas shared with the other tabs of the window
+        self.map_canvas = map_canvas or MapCanvas(parent)
+        self.assets = assets or AssetCache()
+
+        # The tab stays an empty placeholder until it is first shown
+        self.built = False
+        self.flag_label = None
+
+    def build(self):
+        if self.built:
+            return
+        with TRACER.span('build'):
+            self.build_map()
+
+    def build_map(self):
+        self.built = True
+
+        # A tab rebuilt after eviction gets its selection back once the map is loaded
+        selected, self.selected = self.selected, set()
+
+        # Axes of our own in the shared figure, the figure takes our background color while we are shown
+        self.fig = self.map_canvas.figure
+        self.ax = self.map_canvas.add_axes()
+
+        # Load the GeoJSON file, through the binary cache when possible
+        with TRACER.span('load'):
+            self.data = load_geodata(self.geojson_path, names=self.names)
+
+        # Renderer, spatial index and full view of the map
+        self.renderer, self.hit_tester, self.home_limits = build_map_view(self.ax, self.data, self.default_color, self.bg_color, self.border_color, self.border_width)
+        self.drag_start = None
+        self.drag_offset = None
+        self.drag_mode = None
+        self.pan_background = None
+
+        # Rubber band for shift-drag box and ctrl-drag lasso selections
+        self.band_points = []
+        self.band = Line2D([], [], color=self.clicked_color, linewidth=2, linestyle='--', animated=True, visible=False)
+        self.ax.add_artist(self.band)
+
+        # Status bar with the name of the province under the mouse
+        self.status = tk.Label(self, text="", anchor="w", font=('Helvetica', 12))
+        self.status.pack(side=tk.BOTTOM, fill=tk.X)
+
+        # The canvas is packed into the tab when it is shown
+        self.canvas = self.map_canvas.canvas
+
+        # Motion events come much faster than we can paint, only the latest one is handled
+        self.hover_throttle = MotionThrottle(self.after, HOVER_INTERVAL_MS, self.on_hover)
+
+        # Event handlers, called by the shared canvas while this tab is shown; a press without a drag is a click
+        self.handlers = {
+            'button_press_event': self.on_press,
+            'motion_notify_event': self.on_motion,
+            'button_release_event': self.on_release,
+            'scroll_event': self.on_scroll,
+            'axes_leave_event': lambda e: self.hover_throttle.push(None, None),
+            'resize_event': lambda e: self.renderer.update_level_of_detail(),
+        }
+
+        # Add the flag image
+        if self.flag_image_path:
+            self.add_flag_image(self.flag_image_path)
+
+        if self.metric is not None:
+            self.set_metric(self.metric, self.cmap)
+        if self.timeseries is not None:
+            self.set_timeseries(self.timeseries, self.fps, self.cmap)
+        if selected:
+            self.set_selection(selected)
+
+        self.geometry_bytes = map_data_size(self.data, self.renderer.tiers)
+
+    def memory_size(self):
+        # Estimated bytes held by a built tab, the canvas buffers are shared and not counted but cached base layers are
+        if not self.built:
+            return 0
+        return self.geometry_bytes + self.renderer.cached_bytes()
+
+    def unload(self):
+        # Free the figure and map data, the tab goes back to a placeholder and is rebuilt when shown again
+        if not self.built:
+            return
+        if self.hover_throttle.job is not None:
+            self.after_cancel(self.hover_throttle.job)
+        for child in self.winfo_children():
+            child.destroy()
+        if self.flag_label is not None:
+            self.flag_label.destroy()
+            self.flag_label = None
+        self.map_canvas.remove(self)
+        self.fig = self.ax = self.canvas = None
+        self.data = self.renderer = self.hit_tester = None
+        self.frames = self.playback = None
+        self.flag_photo = None
+        self.built = False
+
+    def add_flag_image(self, flag_image_path):
+        # Create a label for the flag image, it is placed once the image is decoded
+        # The label is a sibling of the shared map canvas, a child of the tab would always be stacked under it
+        self.flag_label = tk.Label(self.map_canvas.widget.master)
+        self.flag_size = None
+
+        # Bind click event to the label
+        self.flag_label.bind("<Button-1>", lambda e: self.winfo_toplevel().show_details(self.title))
+
+        # Resizing the tab can switch to a smaller or larger flag
+        self.bind("<Configure>", lambda e: self.update_flag())
+        self.update_flag()
+
+    def flag_pixels(self):
+        # Largest flag step taking at most a fifth of the tab width, in device pixels so HiDPI screens get a sharp flag
+        scale = screen_scale(self)
+        width = self.winfo_width()
+        steps = [step for step in FLAG_STEPS if width <= 1 or FLAG_SIZE[0] * step * scale <= width / 5]
+        return scaled_size(FLAG_SIZE, (steps or FLAG_STEPS[:1])[-1] * scale)
+
+    def update_flag(self):
+        if not self.built or not self.flag_image_path:
+            return
+        size = self.flag_pixels()
+        if size != self.flag_size:
+            self.flag_size = size
+            self.assets.load(self.flag_image_path, size)
+            self.show_flag(size)
+
+    def show_flag(self, size):
+        # Polled from the Tk thread until the worker has decoded the flag, a newer size makes this one stale
+        if not self.built or size != self.flag_size:
+            return
+        try:
+            photo = self.assets.photo(self.flag_image_path, size)
+        except OSError as error:
+            print(f"Could not load the flag {self.flag_image_path}: {error}")
+            return
+        if photo is None:
+            self.after(ASSET_POLL_MS, self.show_flag, size)
+            return
+        self.flag_photo = photo
+        self.flag_label.configure(image=photo)
+        self.flag_label.image = photo
+        self.flag_label.place(in_=self, x=10, y=10)
+        self.lift_overlays()
+
+    def lift_overlays(self):
+        # Widgets over the map go back on top whenever the shared canvas is packed into this tab
+        if self.flag_label is not None:
+            self.flag_label.lift()
+
+    def on_press(self, event):
+        if event.inaxes is not self.ax:
+            return
+        self.drag_start = (event.x, event.y)
+        self.drag_offset = None
+
+        # Plain drags pan, shift-drags select a box and ctrl-drags a lasso
+        # The modifiers come with the mouse event itself, event.key is only the last key the canvas saw while focused
+        if 'ctrl' in event.modifiers:
+            self.drag_mode = 'lasso'
+        elif 'shift' in event.modifiers:
+            self.drag_mode = 'box'
+        else:
+            self.drag_mode = 'pan'
+        self.band_points = [(event.xdata, event.ydata)]
+
+    def on_motion(self, event):
+        if self.drag_start is None:
+            self.hover_throttle.push(event.xdata, event.ydata)
+            return
+        dx = event.x - self.drag_start[0]
+        dy = event.y - self.drag_start[1]
+        if self.drag_offset is None and abs(dx) + abs(dy) < DRAG_THRESHOLD:
+            return
+        self.drag_offset = (dx, dy)
+
+        if self.drag_mode != 'pan':
+            self.update_band(event)
+            return
+
+        # While dragging, slide a snapshot of the last frame instead of redrawing every province
+        if self.pan_background is None:
+            self.pan_background = self.canvas.copy_from_bbox(self.ax.bbox)
+        self.ax.draw_artist(self.ax.patch)
+        x1, y1, x2, y2 = self.pan_background.get_extents()
+        # Snapshot extents count rows from the top, so the vertical offset flips
+        with TRACER.span('pan'):
+            self.canvas.restore_region(self.pan_background, xy=(x1 + dx, y1 - dy))
+            self.canvas.blit(self.ax.bbox)
+
+    def update_band(self, event):
+        if event.inaxes is not self.ax:
+            return
+        if self.drag_mode == 'box':
+            self.band_points = self.band_points[:1] + [(event.xdata, event.ydata)]
+            (x0, y0), (x1, y1) = self.band_points
+            self.band.set_data([x0, x1, x1, x0, x0], [y0, y0, y1, y1, y0])
+        else:
+            self.band_points.append((event.xdata, event.ydata))
+            xs, ys = zip(*self.band_points, self.band_points[0])
+            self.band.set_data(xs, ys)
+        self.band.set_visible(True)
+        self.renderer.draw_transient([self.band])
+
+    def on_hover(self, x, y):
+        with TRACER.span('hover'):
+            self.hover(x, y)
+
+    def hover(self, x, y):
+        with TRACER.span('hit_test'):
+            province_index = self.hit_tester.locate(x, y) if x is not None and y is not None else None
+        if self.renderer.set_hover(province_index):
+            self.status.config(text=self.data.loc[province_index, NAME_COLUMN] if province_index is not None else "")
+
+            # The hovered province is the most likely next click, then its neighbours
+            prefetcher = self.winfo_toplevel().detail_prefetcher
+            if province_index is not None and prefetcher is not None:
+                prefetcher.add(self.data.loc[[province_index], NAME_COLUMN].dropna(), prefetcher.HOVERED)
+                prefetcher.add(self.data.loc[self.hit_tester.neighbors(province_index), NAME_COLUMN].dropna(), prefetcher.NEIGHBOR)
+
+    def detail_titles(self):
+        # Every page this tab can open: the map itself and its provinces
+        return [self.title] + list(self.data[NAME_COLUMN].dropna())
+
+    def on_release(self, event):
+        if self.drag_start is None:
+            return
+        drag_offset = self.drag_offset
+        self.drag_start = None
+        self.drag_offset = None
+        self.pan_background = None
+        if drag_offset is None:
+            if self.drag_mode == 'box':
+                self.on_shift_click(event)
+            else:
+                self.on_click(event)
+            return
+
+        if self.drag_mode != 'pan':
+            self.finish_band()
+            return
+
+        # Move the view by the dragged distance and draw it properly once
+        inverse = self.ax.transData.inverted()
+        (x0, y0), (x1, y1) = inverse.transform([(0, 0), drag_offset])
+        xlim = self.ax.get_xlim()
+        ylim = self.ax.get_ylim()
+        self.ax.set_xlim(xlim[0] - (x1 - x0), xlim[1] - (x1 - x0))
+        self.ax.set_ylim(ylim[0] - (y1 - y0), ylim[1] - (y1 - y0))
+        self.canvas.draw_idle()
+
+    def on_scroll(self, event):
+        if event.xdata is None or event.ydata is None:
+            return
+        scale = 1 / ZOOM_STEP if event.button == 'up' else ZOOM_STEP
+
+        # Zoom around the mouse pointer, between the whole map and MAX_ZOOM
+        (home_x0, home_x1), (home_y0, home_y1) = self.home_limits
+        x0, x1 = self.ax.get_xlim()
+        y0, y1 = self.ax.get_ylim()
+        width = (x1 - x0) * scale
+        if width >= home_x1 - home_x0:
+            self.ax.set_xlim(home_x0, home_x1)
+            self.ax.set_ylim(home_y0, home_y1)
+        elif width >= (home_x1 - home_x0) / MAX_ZOOM:
+            self.ax.set_xlim(event.xdata - (event.xdata - x0) * scale, event.xdata + (x1 - event.xdata) * scale)
+            self.ax.set_ylim(event.ydata - (event.ydata - y0) * scale, event.ydata + (y1 - event.ydata) * scale)
+        else:
+            return
+        self.canvas.draw_idle()
+
+    def on_click(self, event):
+        with TRACER.span('click'):
+            self.click(event)
+
+    def click(self, event):
+        # Get the clicked point coordinates
+        x, y = event.xdata, event.ydata
+        if x is not None and y is not None:
+            # Find the province that contains the clicked point
+            with TRACER.span('hit_test'):
+                province_index = self.hit_tester.locate(x, y)
+            if province_index is not None:
+                with TRACER.span('select'):
+                    self.select_province(province_index)
+
+                # Get the name of the province
+                province_name = self.data.loc[province_index, NAME_COLUMN]
+                print(f"Clicked on: {province_name}")
+
+                # Open the WikipediaViewer with the selected province
+                with TRACER.span('details'):
+                    self.winfo_toplevel().show_details(province_name)
+
+    def on_shift_click(self, event):
+        # Shift-click adds a province to the selection, or removes it again
+        if event.xdata is None or event.ydata is None:
+            return
+        province_index = self.hit_tester.locate(event.xdata, event.ydata)
+        if province_index is not None:
+            self.set_selection(self.selected ^ {province_index})
+
+    def finish_band(self):
+        self.band.set_visible(False)
+        self.renderer.draw_transient([])
+        points = self.band_points
+        self.band_points = []
+        if len(points) < 2 or any(x is None for x, y in points):
+            return
+
+        # Everything the box or lasso touches joins the selection
+        if self.drag_mode == 'box':
+            (x0, y0), (x1, y1) = points
+            region = shapely.box(min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1))
+        elif len(points) >= 3:
+            # A lasso crossing itself is not a valid polygon, make_valid splits it into valid parts
+            region = shapely.make_valid(shapely.Polygon(points))
+        else:
+            return
+        self.set_selection(self.selected | set(self.hit_tester.intersecting(region)))
+
+    def select_province(self, province_index):
+        # A plain click replaces the whole selection with one province
+        self.set_selection({province_index})
+        self.current_province = province_index
+
+    def set_selection(self, provinces):
+        provinces = set(provinces)
+        change_selection(self.renderer, self.selected, provinces, self.clicked_color)
+        self.selected = provinces
+        if self.current_province not in provinces:
+            self.current_province = None
+        if len(provinces) > 1:
+            self.status.config(text=f"{len(provinces)} provinces selected")
+
+    def selected_names(self):
+        return list(self.data.loc[sorted(self.selected), NAME_COLUMN])
+
+    def set_metric(self, values, cmap='viridis', vmin=None, vmax=None):
+        # Show per-province numbers as a choropleth, the color scale is fixed here for later updates
+        values = self.metric_values(values)
+        self.metric_cmap = matplotlib.colormaps.get_cmap(cmap)
+        self.metric_norm = Normalize(vmin, vmax)
+        self.metric_norm.autoscale_None(np.ma.masked_invalid(values.to_numpy(dtype=float)))
+        self.show_colors(metric_colors(values, self.metric_cmap, self.metric_norm, self.default_color))
+
+    def update_metric(self, values):
+        # New values for the same metric, e.g. the next time step, recolor the existing patches only
+        values = self.metric_values(values)
+        self.show_colors(metric_colors(values, self.metric_cmap, self.metric_norm, self.default_color))
+
+    def show_colors(self, colors):
+        with TRACER.span('recolor'):
+            self.renderer.set_base_colors(colors)
+        self.canvas.draw_idle()
+
+    def set_timeseries(self, table, fps=10, cmap='viridis', vmin=None, vmax=None):
+        # Play back a table with one row per NAME_1 and one column per time step
+        table = table.reindex(self.data[NAME_COLUMN])
+        values = table.to_numpy(dtype=float).T
+        self.metric_cmap = matplotlib.colormaps.get_cmap(cmap)
+        self.metric_norm = Normalize(vmin, vmax)
+        self.metric_norm.autoscale_None(np.ma.masked_invalid(values))
+        self.frames = FrameBuffer(values, self.metric_cmap, self.metric_norm, self.default_color)
+
+        if self.playback is not None:
+            self.playback.destroy()
+        self.playback = PlaybackControls(self, [str(column) for column in table.columns], fps)
+        self.playback.pack(side=tk.BOTTOM, fill=tk.X, before=self.status)
+        self.show_frame(0)
+
+    def show_frame(self, frame):
+        self.show_colors(self.frames.get(frame))
+
+    def style(self):
+        # Everything needed to draw this map the same way without Tk, shared with the headless renderer
+        return map_style(self.default_color, self.bg_color)
+
+    def metric_values(self, values):
+        # A column of the GeoJSON, or a Series or dict keyed by NAME_1
+        if isinstance(values, str):
+            return self.data[values]
+        return self.data[NAME_COLUMN].map(values)
+
+# Estimated memory the built maps may use together before the least recently shown ones are unloaded
+MAP_MEMORY_BUDGET = 512 * 1024 * 1024
+
+class MapRegistry:
+    # Manifest entries by name, plus the built tabs in least recently shown order
+    def __init__(self, entries, budget=MAP_MEMORY_BUDGET):
+        self.entries = OrderedDict((entry['name'], entry) for entry in entries)
+        self.budget = budget
+        self.resident = OrderedDict()
+
+    def search(self, text, limit=50):
+        # Names whose name or title contains the text, the ones starting with it first
+        text = text.strip().lower()
+        matches = [(not (name.lower().startswith(text) or entry['title'].lower().startswith(text)), position, name)
+                   for position, (name, entry) in enumerate(self.entries.items())
+                   if text in name.lower() or text in entry['title'].lower()]
+        return [name for _, _, name in sorted(matches)[:limit]]
+
+    def touch(self, name, tab, recent=True):
+        # Record a built tab, prefetched tabs go to the front so they are the first to be evicted
+        self.resident[name] = tab
+        self.resident.move_to_end(name, last=recent)
+
+    def memory(self):
+        return sum(tab.memory_size() for tab in self.resident.values())
+
+    def evict(self, keep=None):
+        # Unload the least recently shown maps until the rest fit in the budget, the visible one always stays
+        evicted = []
+        total = self.memory()
+        for name, tab in list(self.resident.items()):
+            if total <= self.budget:
+                break
+            if tab is keep:
+                continue
+            total -= tab.memory_size()
+            tab.unload()
+            del self.resident[name]
+            evicted.append(name)
+        return evicted
+
+class MapSwitcher(tk.Frame):
+    # Search box over every registered map, picking one opens or selects its tab
+    def __init__(self, master, registry, open_map):
+        super().__init__(master)
+        self.registry = registry
+        self.open_map = open_map
+        tk.Label(self, text="Go to map:", font=('Helvetica', 12)).pack(side=tk.LEFT, padx=(10, 5))
+        self.search = ttk.Combobox(self, values=registry.search(""), font=('Helvetica', 12), width=30)
+        self.search.pack(side=tk.LEFT, pady=5)
+        self.search.bind("<KeyRelease>", self.on_key)
+        self.search.bind("<Return>", self.on_return)
+        self.search.bind("<<ComboboxSelected>>", lambda e: self.choose(self.search.get()))
+
+    def on_key(self, event):
+        if event.keysym not in ('Return', 'Up', 'Down', 'Escape'):
+            self.search.configure(values=self.registry.search(self.search.get()))
+
+    def on_return(self, event):
+        matches = self.registry.search(self.search.get(), limit=1)
+        if matches:
+            self.choose(matches[0])
+
+    def choose(self, name):
+        if name in self.registry.entries:
+            self.search.set("")
+            self.search.configure(values=self.registry.search(""))
+            self.open_map(name)
+
+class TraceOverlay(tk.Label):
+    # Frame rate and the latest click, hover and draw times from the tracer, refreshed twice a second
+    REFRESH_MS = 500
+
+    def __init__(self, master):
+        super().__init__(master, font=('Courier', 11), anchor="e")
+        self.refresh()
+
+    def refresh(self):
+        latest = TRACER.latest
+        self.config(text=f"{TRACER.frame_rate():3.0f} fps  click {latest.get('click', 0):6.1f} ms  "
+                         f"hover {latest.get('hover', 0):5.1f} ms  draw {latest.get('draw', 0):6.1f} ms")
+        self.after(self.REFRESH_MS, self.refresh)
+
+class MapApp(tk.Tk):
+    def __init__(self, prefetch=False, report_startup=False, prefetch_details=True, metric=None, cmap='viridis', timeseries=None, fps=10, maps=None, memory_budget=MAP_MEMORY_BUDGET, trace_overlay=False):
+        super().__init__()
+        self.title("Interactive Map by Maneesh")
+        self.geometry("1200x800")
+        self.prefetch = prefetch
+        self.report_startup = report_startup
+        self.tab_options = {'metric': metric, 'cmap': cmap, 'timeseries': timeseries, 'fps': fps}
+
+        # Registered maps, only their metadata until a tab is opened
+        self.registry = MapRegistry(load_manifest(MANIFEST_PATH) if maps is None else maps, memory_budget)
+        self.tabs = {}
+        self.tab_names = {}
+
+        # Detail pages are fetched off the Tk thread and shown in a single reusable window
+        self.detail_loader = DetailLoader()
+        self.viewer = None
+
+        # Detail pages of the visible map are fetched ahead of time
+        self.detail_prefetcher = DetailPrefetcher(self.detail_loader) if prefetch_details else None
+
+        self.style = ttk.Style()
+        self.style.configure('TNotebook.Tab', font=('Helvetica', 14, 'bold'), padding=[10, 5])
+
+        # Searchable list of every registered map, above the tabs of the open ones
+        self.switcher = MapSwitcher(self, self.registry, self.open_map)
+        self.switcher.pack(fill=tk.X)
+        if trace_overlay:
+            TraceOverlay(self.switcher).pack(side=tk.RIGHT, padx=10)
+
+        # Create a notebook (tabbed interface)
+        self.notebook = ttk.Notebook(self)
+        self.notebook.pack(fill="both", expand=True)
+
+        # Every tab draws into one figure and canvas, only the selected tab's axes are visible
+        self.tab_options['map_canvas'] = MapCanvas(self.notebook)
+
+        # Flags are decoded on worker threads, starting now for the tabs opened at startup
+        self.assets = AssetCache()
+        self.tab_options['assets'] = self.assets
+
+        # Add a tab for every map opened at startup, with its specific colors and flag
+        # These are cheap placeholders, each map is loaded the first time its tab is shown
+        startup = [name for name, entry in self.registry.entries.items() if entry['open']] or list(self.registry.entries)[:1]
+        flag_size = scaled_size(FLAG_SIZE, screen_scale(self))
+        for name in startup:
+            self.add_tab(name)
+            if self.registry.entries[name]['flag']:
+                self.assets.load(self.registry.entries[name]['flag'], flag_size)
+
+        # Build tabs on first show, starting with the visible one
+        self.notebook.bind("<<NotebookTabChanged>>", self.on_tab_changed)
+        self.on_tab_changed()
+
+        # Wait for the visible map to be drawn before reporting or prefetching
+        first_tab = self.nametowidget(self.notebook.select())
+        self.first_draw = first_tab.canvas.mpl_connect("draw_event", lambda e: self.on_first_frame(first_tab))
+
+    def add_tab(self, name):
+        entry = self.registry.entries[name]
+        tab = MapTab(self.notebook, entry['geojson'], entry['title'], entry['map_color'], entry['bg_color'], entry['flag'], names=entry['names'], **self.tab_options)
+        self.notebook.add(tab, text=name)
+        self.tabs[name] = tab
+        self.tab_names[str(tab)] = name
+        return tab
+
+    def open_map(self, name):
+        # Switcher picks open a tab for the map on first use, later picks just select it
+        tab = self.tabs.get(name) or self.add_tab(name)
+        self.notebook.select(tab)
+
+    def on_tab_changed(self, event=None):
+        tab = self.nametowidget(self.notebook.select())
+        tab.build()
+        tab.map_canvas.show(tab)
+        # The shown map is the most recent, idle ones are unloaded once the budget is exceeded
+        self.registry.touch(self.tab_names[str(tab)], tab)
+        self.registry.evict(keep=tab)
+        if self.detail_prefetcher is not None:
+            self.detail_prefetcher.start(tab.detail_titles())
+
+    def on_first_frame(self, first_tab):
+        first_tab.canvas.mpl_disconnect(self.first_draw)
+        if self.report_startup:
+            print(f"Time to first interactive frame: {time.perf_counter() - STARTUP_TIME:.2f} s")
+        if self.prefetch:
+            self.after_idle(self.prefetch_next_tab)
+
+    def show_details(self, title):
+        if self.viewer is None or not self.viewer.winfo_exists():
+            with TRACER.span('viewer'):
+                self.viewer = WikipediaViewer(self, self.detail_loader)
+        self.viewer.open(title)
+
+    def destroy(self):
+        if self.detail_prefetcher is not None:
+            self.detail_prefetcher.cancel()
+        self.detail_loader.shutdown()
+        self.assets.shutdown()
+        super().destroy()
+
+    def prefetch_next_tab(self):
+        # Build one hidden tab per idle callback so user input is never blocked for long
+        # Prefetching stops at the memory budget rather than evicting maps the user has looked at
+        if self.registry.memory() >= self.registry.budget:
+            return
+        for tab_id in self.notebook.tabs():
+            tab = self.nametowidget(tab_id)
+            if not tab.built:
+                tab.build()
+                self.registry.touch(self.tab_names[str(tab)], tab, recent=False)
+                self.after_idle(self.prefetch_next_tab)
+                return
+
+if __name__ == "__main__":
+    # Imported here, once every name it takes from this script is defined
+    import benchmarks
+    parser = argparse.ArgumentParser(description="Interactive map of China, India, USA and Europe")
+    parser.add_argument("--benchmark", nargs="+", choices=sorted(benchmarks.BENCHMARKS) + ['suite'], help="run headless benchmarks instead of the app, 'suite' runs the reproducible set")
+    parser.add_argument("--benchmark-json", metavar="RESULTS_JSON", help="save the benchmark results and the environment they ran in")
+    parser.add_argument("--compare", metavar="BASELINE_JSON", help="compare the benchmark results with a saved run and list costs that changed by more than --compare-threshold and 3x their measured noise")
+    parser.add_argument("--compare-threshold", type=float, default=20, metavar="PERCENT", help="smallest change --compare reports, 20%% by default")
+    parser.add_argument("--prefetch", action="store_true", help="build the hidden tabs in the background once the first one is shown")
+    parser.add_argument("--startup-time", action="store_true", help="print the time to the first interactive frame")
+    parser.add_argument("--no-detail-prefetch", action="store_true", help="only fetch detail pages when they are opened")
+    parser.add_argument("--metric-csv", help="CSV with a NAME_1 column and per-province values to show as a choropleth")
+    parser.add_argument("--metric-column", help="column of --metric-csv to show")
+    parser.add_argument("--cmap", default="viridis", help="matplotlib colormap for the choropleth")
+    parser.add_argument("--timeseries-csv", help="CSV with a NAME_1 column and one column per time step to play back")
+    parser.add_argument("--fps", type=float, default=10, help="playback frame rate for --timeseries-csv")
+    parser.add_argument("--render", metavar="OUT_DIR", help="render images headless instead of starting the app: one per province, or one per --timeseries-csv column")
+    parser.add_argument("--manifest", default=MANIFEST_PATH, help="JSON or TOML file listing the maps, maps.json next to this file by default")
+    parser.add_argument("--memory-budget", type=float, default=MAP_MEMORY_BUDGET / 2**20, help="MB the built maps may use before idle ones are unloaded")
+    parser.add_argument("--maps", nargs="+", help="names of the maps to render or benchmark, all by default")
+    parser.add_argument("--trace", metavar="TRACE_JSON", help="record timing spans and write them as a Chrome trace on exit, MAP_TRACE=TRACE_JSON does the same")
+    parser.add_argument("--trace-overlay", action="store_true", help="show the frame rate and click, hover and draw times over the map")
+    parser.add_argument("--format", choices=["png", "svg"], default="png", help="image format for --render")
+    parser.add_argument("--workers", type=int, help="worker processes for --render, one per core by default")
+    args = parser.parse_args()
+    if args.trace or args.trace_overlay:
+        TRACER.enable(args.trace)
+
+    manifest = load_manifest(args.manifest)
+    unknown = set(args.maps or []) - {entry['name'] for entry in manifest}
+    if unknown:
+        parser.error(f"--maps: not in {args.manifest}: {', '.join(sorted(unknown))}")
+    selected_maps = [entry for entry in manifest if not args.maps or entry['name'] in args.maps]
+
+    if args.metric_csv and not args.metric_column:
+        parser.error("--metric-csv needs --metric-column")
+    metric = load_metric_csv(args.metric_csv, args.metric_column) if args.metric_csv else None
+    timeseries = load_timeseries_csv(args.timeseries_csv) if args.timeseries_csv else None
+
+    if args.benchmark:
+        benchmarks.run_benchmarks(args.benchmark, selected_maps, args.benchmark_json, args.compare, args.compare_threshold / 100)
+    elif args.render:
+        render_batch(args.render, selected_maps, timeseries, args.format, args.workers, args.cmap)
+    else:
+        app = MapApp(prefetch=args.prefetch, report_startup=args.startup_time, prefetch_details=not args.no_detail_prefetch, metric=metric, cmap=args.cmap, timeseries=timeseries, fps=args.fps, maps=manifest, memory_budget=args.memory_budget * 2**20, trace_overlay=args.trace_overlay)
+        app.mainloop()
+
+    if TRACER.enabled:
+        TRACER.print_summary()
+        if TRACER.path:
+            TRACER.export()
+            print(f"Trace written to {TRACER.path}")
+
@@ -0,0 +1,986 @@
+# Headless benchmarks of the map app, run with python "Final Verison .py" --benchmark NAME
+# They drive the app's own loading, rendering, hit testing and caching code on the Agg backend against the bundled datasets
+import http.server
+import importlib.util
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.colors import Normalize
+from matplotlib.figure import Figure
+import geopandas as gpd
+import matplotlib
+import numpy as np
+import shapely
+from PIL import Image
+
+# Resident memory for the memory benchmark comes from /proc, with getrusage's peak as a fallback
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# The app script registers itself as interactive_map when it runs, its file name has a space and can't be imported
+# Imported on its own, as by a process pool worker started without the app, the script is loaded from its path
+try:
+    import interactive_map
+except ImportError:
+    spec = importlib.util.spec_from_file_location("interactive_map", os.path.join(os.path.dirname(os.path.abspath(__file__)), "Final Verison .py"))
+    interactive_map = importlib.util.module_from_spec(spec)
+    sys.modules["interactive_map"] = interactive_map
+    spec.loader.exec_module(interactive_map)
+
+from interactive_map import (
+    AssetCache, BORDER_COLOR, BORDER_WIDTH, CACHE_DIR, CLICKED_COLOR, DetailLoader, DetailPrefetcher, FLAG_SIZE, FrameBuffer, HOVER_INTERVAL_MS,
+    MapRegistry, MotionThrottle, NAME_COLUMN, PageCache, ProvinceHitTester, ProvinceRenderer, Tracer, build_map_view, change_selection,
+    export_animation, fetch_page, load_geodata, load_manifest, map_data_size, map_style, metric_colors, page_url, polygonal, prepare_geodata, render_batch, scaled_size,
+    simplified_tiers,
+)
+
+def map_label(entry):
+    # Results are keyed by the GeoJSON file name, so runs from different checkouts compare
+    return os.path.basename(entry['geojson'])
+
+def load_map(entry, cache_dir=CACHE_DIR):
+    return load_geodata(entry['geojson'], cache_dir, entry['names'])
+
+# Timings are medians of REPEATS runs after WARMUP runs that are thrown away, those pay for lazy imports and cold caches
+REPEATS = 5
+WARMUP = 1
+# Quick functions are called several times per run, so a run lasts at least this long and the timer's resolution doesn't matter
+MIN_RUN_SECONDS = 0.02
+
+def measure(function, repeats=REPEATS, warmup=WARMUP, setup=None):
+    # Seconds per call of `function` in each of `repeats` runs after the warmup runs, `setup` runs untimed before every run
+    # The warmup picks the number of calls per run, a run with `setup` is a single call
+    samples = []
+    number = 1
+    for run in range(warmup + repeats):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        elapsed = (time.perf_counter() - start) / number
+        if run < warmup:
+            if setup is None:
+                number = max(1, min(10000, int(MIN_RUN_SECONDS / max(elapsed, 1e-9))))
+        else:
+            samples.append(elapsed)
+    return samples
+
+def median_noise(samples):
+    # Relative standard error of the median of `samples`, from their median absolute deviation so one outlier doesn't inflate it
+    # 1.4826 turns the deviation into a standard deviation, 1.2533 / sqrt(n) that into the error of a median
+    median = statistics.median(samples)
+    if median <= 0 or len(samples) < 2:
+        return 0.0
+    deviation = statistics.median(abs(sample - median) for sample in samples)
+    return 1.4826 * 1.2533 * deviation / (median * len(samples) ** 0.5)
+
+# Seconds are converted to the unit named in the result key
+UNIT_SCALES = {'ms': 1e3, 'us': 1e6, 'ns': 1e9}
+
+def timing_results(samples):
+    # {'draw_ms': [seconds, ...]} -> {'draw_ms': median in ms, 'draw_ms_noise': its relative error}, the noise is what --compare allows for
+    results = {}
+    for name, values in samples.items():
+        scale = next(UNIT_SCALES[part] for part in name.split('_') if part in UNIT_SCALES)
+        results[name] = scale * statistics.median(values)
+        results[f"{name}_noise"] = median_noise(values)
+    return results
+
+def show_map(ax, data, entry):
+    # The map built by the same code as MapTab.build_map, with the level of detail MapCanvas.show picks for the window size
+    renderer, hit_tester, home_limits = build_map_view(ax, data, entry['map_color'], entry['bg_color'])
+    renderer.update_level_of_detail()
+    return renderer, hit_tester
+
+def benchmark_click_repaint(maps, clicks=50):
+    # Compare the old clear-and-replot click path against the retained renderer, headless on Agg
+    results = {}
+    for entry in maps:
+        label = map_label(entry)
+        data = load_map(entry).copy()
+        data['color'] = '#FF9933'
+        rng = np.random.default_rng(0)
+        targets = rng.choice(data.index.to_numpy(), size=clicks)
+
+        fig = Figure(figsize=(12, 8))
+        canvas = FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
+        data.plot(ax=ax, color=data['color'], edgecolor='black', linewidth=1)
+        canvas.draw()
+        full = []
+        for index in targets:
+            start = time.perf_counter()
+            data['color'] = '#FF9933'
+            data.loc[index, 'color'] = '#007FFF'
+            ax.clear()
+            data.plot(ax=ax, color=data['color'], edgecolor='black', linewidth=1)
+            ax.set_axis_off()
+            canvas.draw()
+            full.append(time.perf_counter() - start)
+
+        fig = Figure(figsize=(12, 8))
+        canvas = FigureCanvasAgg(fig)
+        renderer, hit_tester = show_map(fig.add_subplot(), data, entry)
+        canvas.draw()
+        # One click first, the first repaint after a draw caches the base layer
+        selected = {data.index[-1]}
+        change_selection(renderer, set(), selected, CLICKED_COLOR)
+        retained = []
+        for index in targets:
+            start = time.perf_counter()
+            change_selection(renderer, selected, {index}, CLICKED_COLOR)
+            selected = {index}
+            retained.append(time.perf_counter() - start)
+
+        results[label] = timing_results({'full_replot_ms': full, 'retained_ms': retained})
+        print(f"{label}: full replot {results[label]['full_replot_ms']:.1f} ms, retained {results[label]['retained_ms']:.1f} ms (median of {clicks} clicks)")
+    return results
+
+def benchmark_hit_test(maps, points=2000):
+    # Compare the per-click contains scan against the spatial index on random points inside each map
+    results = {}
+    for entry in maps:
+        label = map_label(entry)
+        data = load_map(entry)
+        rng = np.random.default_rng(0)
+        min_x, min_y, max_x, max_y = data.total_bounds
+        xs = rng.uniform(min_x, max_x, points)
+        ys = rng.uniform(min_y, max_y, points)
+
+        build = measure(lambda: ProvinceHitTester(data))
+        hit_tester = ProvinceHitTester(data)
+
+        def scan():
+            for x, y in zip(xs[:200], ys[:200]):
+                data[data.contains(gpd.points_from_xy([x], [y])[0])]
+
+        def locate():
+            for x, y in zip(xs, ys):
+                hit_tester.locate(x, y)
+
+        results[label] = timing_results({'build_ms': build, 'scan_us': [sample / 200 for sample in measure(scan)],
+                                         'locate_us': [sample / points for sample in measure(locate)],
+                                         'locate_many_us': [sample / points for sample in measure(lambda: hit_tester.locate_many(xs, ys))]})
+        print(f"{label}: index build {results[label]['build_ms']:.1f} ms, contains scan {results[label]['scan_us']:.0f} us, locate {results[label]['locate_us']:.0f} us, "
+              f"locate_many {results[label]['locate_many_us']:.1f} us per point")
+    return results
+
+def benchmark_load(maps, repeats=REPEATS):
+    # Parse time straight from GeoJSON, on a cold cache and on a warm cache
+    results = {}
+    cache_dir = os.path.join(CACHE_DIR, "benchmark")
+    for entry in maps:
+        path, label = entry['geojson'], map_label(entry)
+
+        def clear_cache():
+            for name in os.listdir(cache_dir) if os.path.isdir(cache_dir) else []:
+                os.remove(os.path.join(cache_dir, name))
+
+        results[label] = timing_results({'geojson_ms': measure(lambda: gpd.read_file(path), repeats),
+                                         'cold_ms': measure(lambda: load_map(entry, cache_dir), repeats, setup=clear_cache),
+                                         'warm_ms': measure(lambda: load_map(entry, cache_dir), repeats)})
+        print(f"{label}: GeoJSON {results[label]['geojson_ms']:.1f} ms, cold cache {results[label]['cold_ms']:.1f} ms, warm cache {results[label]['warm_ms']:.1f} ms")
+    return results
+
+def benchmark_build(maps, repeats=REPEATS):
+    # Opening a tab on a warm cache: load, build the map with the tab's own code, and the first draw
+    # Every build gets new axes on one shared figure and takes them out again, as the window does for an unloaded tab
+    results = {}
+    figure = Figure(figsize=(12, 8), dpi=100)
+    FigureCanvasAgg(figure)
+    for entry in maps:
+        label = map_label(entry)
+        timings = {'load_ms': [], 'build_ms': [], 'draw_ms': [], 'total_ms': []}
+        for attempt in range(WARMUP + repeats):
+            start = time.perf_counter()
+            data = load_map(entry)
+            loaded = time.perf_counter()
+            renderer, hit_tester = show_map(figure.add_subplot(), data, entry)
+            built = time.perf_counter()
+            figure.canvas.draw()
+            drawn = time.perf_counter()
+            renderer.disconnect()
+            renderer.ax.remove()
+            if attempt >= WARMUP:
+                timings['load_ms'].append(loaded - start)
+                timings['build_ms'].append(built - loaded)
+                timings['draw_ms'].append(drawn - built)
+                timings['total_ms'].append(drawn - start)
+
+        results[label] = timing_results(timings)
+        print(f"{label}: load {results[label]['load_ms']:.1f} ms, build {results[label]['build_ms']:.1f} ms, first draw {results[label]['draw_ms']:.1f} ms, "
+              f"{results[label]['total_ms']:.1f} ms to open")
+    return results
+
+def benchmark_validation(maps, repeats=REPEATS):
+    # Cost of the load-time cleanup, paid once per source file, against a warm cache load that skips it
+    results = {}
+    cache_dir = os.path.join(CACHE_DIR, "benchmark")
+    for entry in maps:
+        path, label = entry['geojson'], map_label(entry)
+        raw = gpd.read_file(path)
+        geometries = np.asarray(raw.geometry.values, dtype=object)
+        left, right = shapely.STRtree(geometries).query(geometries, predicate='overlaps')
+        overlap_before = shapely.area(shapely.intersection(geometries[left], geometries[right])).sum() / 2
+
+        pipeline = measure(lambda: prepare_geodata(raw.copy(), entry['names'], path), repeats)
+        data = prepare_geodata(raw.copy(), entry['names'], path)
+        geometries = np.asarray(data.geometry.values, dtype=object)
+        left, right = shapely.STRtree(geometries).query(geometries, predicate='overlaps')
+        overlap_after = shapely.area(shapely.intersection(geometries[left], geometries[right])).sum() / 2
+
+        warm = measure(lambda: load_map(entry, cache_dir), repeats)
+
+        results[label] = {**timing_results({'pipeline_ms': pipeline, 'warm_ms': warm}), 'overlap_before': overlap_before, 'overlap_after': overlap_after, **data.attrs['cleanup']}
+        print(f"{label}: cleanup {results[label]['pipeline_ms']:.1f} ms, warm cache {results[label]['warm_ms']:.1f} ms, overlap area {overlap_before:.2g} -> {overlap_after:.2g}, repairs {data.attrs['cleanup']}")
+    return results
+
+def benchmark_registry(maps, count=200, visits=40, budget_mb=16):
+    # Startup cost of a large manifest, and estimated map memory while visiting maps with and without the LRU budget
+    entries = [{'name': f"Map {number}", 'geojson': maps[number % len(maps)]['geojson'], 'names': maps[number % len(maps)]['names'], 'map_color': '#FF9933', 'bg_color': '#009E49'}
+               for number in range(count)]
+    with tempfile.TemporaryDirectory() as directory:
+        manifest_path = os.path.join(directory, "maps.json")
+        with open(manifest_path, 'w') as f:
+            json.dump({'maps': entries}, f)
+        manifest = measure(lambda: MapRegistry(load_manifest(manifest_path), budget_mb * 2**20))
+        registry = MapRegistry(load_manifest(manifest_path), budget_mb * 2**20)
+
+    def search():
+        for text in ["map", "map 1", "map 19", "nothing"]:
+            registry.search(text)
+    timings = timing_results({'manifest_ms': manifest, 'search_us': [sample / 4 for sample in measure(search)]})
+
+    # Stand-in for the window's shared figure, at the default window size
+    figure = Figure(figsize=(12, 8), dpi=100)
+    FigureCanvasAgg(figure)
+
+    class HeadlessMap:
+        # A built tab without its Tk widgets: the tab's own map code on its own axes of the shared figure
+        def __init__(self, entry):
+            data = load_map(entry)
+            self.renderer, self.hit_tester = show_map(figure.add_subplot(), data, entry)
+            self.size = map_data_size(data, self.renderer.tiers)
+
+        def memory_size(self):
+            return self.size + self.renderer.cached_bytes()
+
+        def unload(self):
+            self.renderer.disconnect()
+            self.renderer.ax.remove()
+            self.renderer = None
+
+    unbounded = 0
+    peak = 0
+    evicted = 0
+    shown = None
+    for name in list(registry.entries)[:visits]:
+        tab = HeadlessMap(registry.entries[name])
+        if shown is not None and shown.renderer is not None:
+            shown.renderer.set_shown(False)
+        shown = tab
+        figure.canvas.draw()
+        unbounded += tab.memory_size()
+        registry.touch(name, tab)
+        evicted += len(registry.evict(keep=tab))
+        peak = max(peak, registry.memory())
+
+    result = {'maps': count, **timings, 'visits': visits, 'unbounded_mb': unbounded / 2**20, 'peak_mb': peak / 2**20, 'evicted': evicted}
+    print(f"{count} maps: manifest {timings['manifest_ms']:.1f} ms, search {timings['search_us']:.0f} us; {visits} visits: {unbounded / 2**20:.0f} MB kept without a budget, "
+          f"peak {peak / 2**20:.0f} MB with a {budget_mb} MB budget ({evicted} unloads)")
+    return result
+
+def resident_memory():
+    # Current resident set size in bytes, or the peak so far where /proc is not available
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024 if resource is not None else 0
+
+def measure_map_memory(maps, shared, size=(12, 8), dpi=100):
+    # Runs in a fresh process: resident memory before and after opening each map
+    # Either every map gets its own figure and canvas, as the tabs used to, or they all share one figure
+    readings = [resident_memory()]
+    figure = None
+    opened = []
+    for entry in maps:
+        data = load_map(entry)
+        if shared:
+            if figure is None:
+                figure = Figure(figsize=size, dpi=dpi)
+                FigureCanvasAgg(figure)
+            ax = figure.add_subplot()
+        else:
+            ax = Figure(figsize=size, dpi=dpi).add_subplot()
+            FigureCanvasAgg(ax.figure)
+        if shared:
+            for _, renderer in opened:
+                renderer.set_shown(False)
+        renderer, hit_tester = show_map(ax, data, entry)
+        ax.figure.canvas.draw()
+        opened.append((data, renderer))
+        readings.append(resident_memory())
+    return readings
+
+def benchmark_memory(maps):
+    # Resident memory per opened map with one canvas per map and with the shared figure, each in a new process
+    for entry in maps:
+        load_map(entry)
+    results = {}
+    context = multiprocessing.get_context('spawn')
+    for label, shared in [('canvas per map', False), ('shared figure', True)]:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            readings = pool.submit(measure_map_memory, maps, shared).result()
+        per_map = [(after - before) / 2**20 for before, after in zip(readings, readings[1:])]
+        results[label] = {'baseline_mb': readings[0] / 2**20, 'total_mb': readings[-1] / 2**20, 'per_map_mb': per_map}
+        print(f"{label}: {readings[0] / 2**20:.0f} MB before any map, {readings[-1] / 2**20:.0f} MB with {len(maps)} maps open, "
+              f"per map " + ", ".join(f"{map_label(entry)} +{mb:.1f}" for entry, mb in zip(maps, per_map)) + " MB")
+    return results
+
+def benchmark_assets(maps, loads=20):
+    # Flag loading: the old open-and-resize on the Tk thread vs. the asset cache from scratch, from disk and from memory
+    flags = [entry['flag'] for entry in maps if entry['flag']]
+    sizes = [scaled_size(FLAG_SIZE, scale) for scale in (1.0, 2.0)]
+    results = {}
+    for size in sizes:
+        def inline():
+            for flag in flags:
+                Image.open(flag).resize(size)
+
+        # Every run starts from an empty cache directory
+        timings = {'inline_ms': measure(inline), 'submit_ms': [], 'cold_ms': [], 'disk_ms': [], 'memory_ms': []}
+        for attempt in range(WARMUP + REPEATS):
+            with tempfile.TemporaryDirectory() as directory:
+                # Everything the Tk thread does at startup is submitting the work
+                assets = AssetCache(directory)
+                start = time.perf_counter()
+                futures = [assets.load(flag, size) for flag in flags]
+                submit = time.perf_counter() - start
+                for future in futures:
+                    future.result()
+                cold = time.perf_counter() - start
+                assets.shutdown()
+
+                # A new launch finds the resized PNGs on disk
+                assets = AssetCache(directory)
+                start = time.perf_counter()
+                for future in [assets.load(flag, size) for flag in flags]:
+                    future.result()
+                disk = time.perf_counter() - start
+
+                start = time.perf_counter()
+                for _ in range(loads):
+                    for flag in flags:
+                        assets.load(flag, size).result()
+                memory = (time.perf_counter() - start) / loads
+                assets.shutdown()
+            if attempt >= WARMUP:
+                for name, value in (('submit_ms', submit), ('cold_ms', cold), ('disk_ms', disk), ('memory_ms', memory)):
+                    timings[name].append(value)
+
+        label = f"{size[0]}x{size[1]}"
+        results[label] = timing_results(timings)
+        print(f"{len(flags)} flags at {label}: open and resize on the Tk thread {results[label]['inline_ms']:.1f} ms; asset cache: Tk thread blocked {results[label]['submit_ms']:.2f} ms, "
+              f"ready after {results[label]['cold_ms']:.1f} ms cold, {results[label]['disk_ms']:.1f} ms from disk, {results[label]['memory_ms']:.3f} ms from memory")
+    return results
+
+def benchmark_trace(maps, spans=100000, clicks=50):
+    # Cost of a span with tracing off and on, then the click path of each map broken down by span
+    tracer = Tracer()
+
+    def empty():
+        for _ in range(spans):
+            pass
+
+    def traced():
+        for _ in range(spans):
+            with tracer.span('noop'):
+                pass
+
+    # The bare loop is taken off every run, what is left is the cost of the spans
+    loop = statistics.median(measure(empty))
+    timings = {}
+    for name, enabled in (('off_ns', False), ('on_ns', True)):
+        tracer.enabled = enabled
+        timings[name] = [(sample - loop) / spans for sample in measure(traced)]
+    results = timing_results(timings)
+    print(f"span overhead: {results['off_ns']:.0f} ns off, {results['on_ns']:.0f} ns on")
+
+    saved = interactive_map.TRACER
+    for entry in maps:
+        label = map_label(entry)
+        # The renderer and click steps report to the app's tracer, swap in a fresh one per map
+        TRACER = interactive_map.TRACER = Tracer()
+        TRACER.enable()
+        try:
+            with TRACER.span('load'):
+                data = load_map(entry)
+            fig = Figure(figsize=(12, 8), dpi=100)
+            FigureCanvasAgg(fig)
+            fig.canvas.draw = TRACER.wrap('draw', fig.canvas.draw)
+            renderer, hit_tester = show_map(fig.add_subplot(), data, entry)
+            fig.canvas.draw()
+
+            min_x, min_y, max_x, max_y = data.total_bounds
+            rng = np.random.default_rng(0)
+            selected = set()
+            for x, y in zip(rng.uniform(min_x, max_x, clicks), rng.uniform(min_y, max_y, clicks)):
+                with TRACER.span('click'):
+                    with TRACER.span('hit_test'):
+                        index = hit_tester.locate(x, y)
+                    if index is not None:
+                        with TRACER.span('select'):
+                            change_selection(renderer, selected, {index}, CLICKED_COLOR)
+                            selected = {index}
+                        with TRACER.span('lookup'):
+                            data.loc[index, NAME_COLUMN]
+            results[label] = TRACER.summary()
+            print(f"{label}:")
+            TRACER.print_summary()
+        finally:
+            interactive_map.TRACER = saved
+    return results
+
+def synthetic_dataset(entry, polygons, cache_dir=os.path.join(CACHE_DIR, "synthetic")):
+    # Manifest entry for a GeoJSON with roughly `polygons` provinces, made by cutting every province of `entry` along a square grid
+    # The cut provinces still tile the map, so they behave like a real, much finer dataset; written once and reused
+    out_path = os.path.join(cache_dir, f"{os.path.splitext(map_label(entry))[0]}-{polygons}.geojson")
+    synthetic = {**entry, 'geojson': out_path, 'names': [NAME_COLUMN]}
+    if os.path.exists(out_path):
+        return synthetic
+    data = load_map(entry)
+    geometries = np.asarray(data.geometry.values, dtype=object)
+    min_x, min_y, max_x, max_y = data.total_bounds
+    side = np.sqrt(shapely.area(geometries).sum() / polygons)
+    xs, ys = np.meshgrid(np.arange(min_x, max_x, side), np.arange(min_y, max_y, side))
+    cells = shapely.box(xs.ravel(), ys.ravel(), xs.ravel() + side, ys.ravel() + side)
+
+    cell_positions, province_positions = shapely.STRtree(geometries).query(cells, predicate='intersects')
+    pieces = [polygonal(piece) for piece in shapely.intersection(cells[cell_positions], geometries[province_positions])]
+    names = data[NAME_COLUMN].to_numpy()[province_positions]
+    subdivided = gpd.GeoDataFrame({NAME_COLUMN: [f"{name} {number}" for number, name in enumerate(names)]}, geometry=pieces, crs=data.crs)
+    subdivided = subdivided[shapely.area(np.asarray(subdivided.geometry.values, dtype=object)) > 0]
+
+    os.makedirs(cache_dir, exist_ok=True)
+    temp_path = f"{out_path}.{os.getpid()}.tmp.geojson"
+    subdivided.to_file(temp_path, driver="GeoJSON")
+    os.replace(temp_path, out_path)
+    return synthetic
+
+def benchmark_scale(maps, sizes=(1000, 3000, 10000), points=2000, clicks=20, repeats=3):
+    # Load, build, first draw, hit test and click repaint on finer and finer subdivisions of the first dataset
+    # Time per province that grows with the province count points at super-linear work
+    results = {}
+    rng = np.random.default_rng(0)
+    cache_dir = os.path.join(CACHE_DIR, "benchmark")
+    for entry in [maps[0]] + [synthetic_dataset(maps[0], size) for size in sizes]:
+        label = map_label(entry)
+        timings = {'load_ms': [], 'build_ms': [], 'draw_ms': [], 'hit_test_us': [], 'click_ms': []}
+        for attempt in range(WARMUP + repeats):
+            shutil.rmtree(cache_dir, ignore_errors=True)
+            start = time.perf_counter()
+            data = load_map(entry, cache_dir)
+            load = time.perf_counter() - start
+
+            start = time.perf_counter()
+            fig = Figure(figsize=(12, 8), dpi=100)
+            FigureCanvasAgg(fig)
+            renderer, hit_tester = show_map(fig.add_subplot(), data, entry)
+            build = time.perf_counter() - start
+
+            start = time.perf_counter()
+            fig.canvas.draw()
+            draw = time.perf_counter() - start
+
+            min_x, min_y, max_x, max_y = data.total_bounds
+            xs, ys = rng.uniform(min_x, max_x, points), rng.uniform(min_y, max_y, points)
+            start = time.perf_counter()
+            hit_tester.locate_many(xs, ys)
+            hit_test = time.perf_counter() - start
+
+            repaints = []
+            selected = set()
+            for index in rng.choice(data.index.to_numpy(), size=clicks, replace=False):
+                start = time.perf_counter()
+                change_selection(renderer, selected, {index}, CLICKED_COLOR)
+                repaints.append(time.perf_counter() - start)
+                selected = {index}
+
+            if attempt >= WARMUP:
+                timings['load_ms'].append(load)
+                timings['build_ms'].append(build)
+                timings['draw_ms'].append(draw)
+                timings['hit_test_us'].append(hit_test / points)
+                # The first click after a draw also caches the base layer
+                timings['click_ms'].extend(repaints[1:])
+
+        count = len(data)
+        timings['draw_us_per_province'] = [sample / count for sample in timings['draw_ms']]
+        timings['build_us_per_province'] = [sample / count for sample in timings['build_ms']]
+        results[label] = {'provinces': count, **timing_results(timings)}
+        result = results[label]
+        print(f"{label}: {count} provinces, load {result['load_ms']:.0f} ms, build {result['build_ms']:.0f} ms ({result['build_us_per_province']:.0f} us per province), "
+              f"first draw {result['draw_ms']:.0f} ms ({result['draw_us_per_province']:.0f} us per province), hit test {result['hit_test_us']:.1f} us per point, "
+              f"click {result['click_ms']:.1f} ms")
+    return results
+
+def benchmark_resize(maps, steps=30, dpi=100, repeats=REPEATS):
+    # A resize drag from 1200x800 to 900x600: a full draw at every step vs. a stretched last frame and one draw at the end,
+    # then going back to the earlier size, drawn again vs. composited from the cached base layer
+    results = {}
+    sizes = [(round(1200 - 300 * step / steps), round(800 - 200 * step / steps)) for step in range(1, steps + 1)]
+    for entry in maps:
+        label = map_label(entry)
+        data = load_map(entry)
+        fig = Figure(figsize=(12, 8), dpi=dpi)
+        FigureCanvasAgg(fig)
+        renderer, hit_tester = show_map(fig.add_subplot(), data, entry)
+        change_selection(renderer, set(), {data.index[0]}, CLICKED_COLOR)
+
+        timings = {'redraw_every_step_ms': [], 'preview_step_ms': [], 'debounced_ms': [], 'full_draw_ms': [], 'composite_ms': []}
+        for attempt in range(WARMUP + repeats):
+            fig.set_size_inches(12, 8)
+            fig.canvas.draw()
+            start = time.perf_counter()
+            for width, height in sizes:
+                fig.set_size_inches(width / dpi, height / dpi)
+                fig.canvas.draw()
+            redraw = time.perf_counter() - start
+
+            fig.set_size_inches(12, 8)
+            fig.canvas.draw()
+            previews = []
+            start = time.perf_counter()
+            for width, height in sizes:
+                step = time.perf_counter()
+                Image.fromarray(np.asarray(fig.canvas.buffer_rgba())).resize((width, height), Image.NEAREST)
+                previews.append(time.perf_counter() - step)
+            fig.set_size_inches(sizes[-1][0] / dpi, sizes[-1][1] / dpi)
+            fig.canvas.draw()
+            debounced = time.perf_counter() - start
+
+            # Back to the original size, whose base layer is still cached
+            fig.set_size_inches(12, 8)
+            start = time.perf_counter()
+            fig.canvas.draw()
+            full = time.perf_counter() - start
+            start = time.perf_counter()
+            composited = renderer.composite()
+            composite = time.perf_counter() - start
+
+            if attempt >= WARMUP:
+                timings['redraw_every_step_ms'].append(redraw)
+                timings['preview_step_ms'].extend(previews)
+                timings['debounced_ms'].append(debounced)
+                timings['full_draw_ms'].append(full)
+                if composited:
+                    timings['composite_ms'].append(composite)
+
+        # A run without a composite means the base layer was not reused
+        composites = timings.pop('composite_ms')
+        results[label] = {**timing_results(timings), **(timing_results({'composite_ms': composites}) if len(composites) == repeats else {'composite_ms': None})}
+        result = results[label]
+        print(f"{label}: {steps}-step resize drag, redraw every step {result['redraw_every_step_ms']:.0f} ms vs. preview {result['preview_step_ms']:.1f} ms per step "
+              f"and one draw, {result['debounced_ms']:.0f} ms in total; back at a cached size: full draw {result['full_draw_ms']:.1f} ms, "
+              f"composite {result['composite_ms'] or 0:.1f} ms")
+    return results
+
+def benchmark_level_of_detail(maps, repeats=REPEATS):
+    # Vertex count and full render time of every level-of-detail tier at the default window size
+    results = {}
+    for entry in maps:
+        label = map_label(entry)
+        data = load_map(entry)
+        simplify = measure(lambda: simplified_tiers(data), repeats)
+        tiers = simplified_tiers(data)
+
+        fig = Figure(figsize=(12, 8))
+        canvas = FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
+        ax.set_axis_off()
+        renderer = ProvinceRenderer(ax, data, '#FF9933', BORDER_COLOR, BORDER_WIDTH, tiers, layered=True)
+        canvas.draw()
+        pixel_size = ax.viewLim.width / ax.bbox.width
+        renderer.update_level_of_detail()
+        chosen = renderer.level
+
+        results[label] = {**timing_results({'simplify_ms': simplify}), 'chosen_level': chosen, 'tiers': []}
+        print(f"{label}: simplified in {results[label]['simplify_ms']:.0f} ms, pixel size {pixel_size:.4f}, tier {chosen} chosen")
+        for level, (tolerance, geometries) in enumerate(tiers):
+            renderer.set_level(level)
+            render = timing_results({'render_ms': measure(canvas.draw, repeats)})
+            vertices = int(shapely.get_num_coordinates(np.asarray(geometries.values, dtype=object)).sum())
+            results[label]['tiers'].append({'tolerance': tolerance, 'vertices': vertices, **render})
+            print(f"  tier {level}: tolerance {tolerance:.4f}, {vertices} vertices, render {render['render_ms']:.1f} ms")
+    return results
+
+def benchmark_hover(maps, events=3000, event_interval_ms=2.0, repeats=REPEATS):
+    # Replays a synthetic mouse trace at 500 Hz against a simulated event loop, with and without throttling
+    frame_ms = 1000 / 60
+    results = {}
+    for entry in maps:
+        label = map_label(entry)
+        data = load_map(entry)
+        fig = Figure(figsize=(12, 8))
+        canvas = FigureCanvasAgg(fig)
+        renderer, hit_tester = show_map(fig.add_subplot(), data, entry)
+        canvas.draw()
+
+        # Random walk across the map
+        rng = np.random.default_rng(0)
+        min_x, min_y, max_x, max_y = data.total_bounds
+        step = (max_x - min_x) / 200
+        xs = np.clip(min_x + (max_x - min_x) / 2 + np.cumsum(rng.normal(0, step, events)), min_x, max_x)
+        ys = np.clip(min_y + (max_y - min_y) / 2 + np.cumsum(rng.normal(0, step, events)), min_y, max_y)
+        arrivals = np.arange(events) * event_interval_ms
+
+        def handle(x, y):
+            start = time.perf_counter()
+            renderer.set_hover(hit_tester.locate(x, y))
+            return 1000 * (time.perf_counter() - start)
+
+        def replay(mode):
+            # Costs of the handled events and the time from each event to its paint, on the simulated clock in ms
+            renderer.set_hover(None)
+            clock = 0.0
+            handled = []
+            latencies = []
+            if mode == 'unthrottled':
+                # Every event is handled in arrival order, a slow handler builds a backlog
+                for arrival, x, y in zip(arrivals, xs, ys):
+                    clock = max(clock, arrival)
+                    cost = handle(x, y)
+                    clock += cost
+                    handled.append(cost)
+                    latencies.append(clock - arrival)
+            else:
+                # A simulated after() queue drives MotionThrottle exactly as Tk would
+                jobs = []
+                def schedule(delay, callback):
+                    jobs.append((clock + delay, callback))
+                    return len(jobs)
+                throttle = MotionThrottle(schedule, HOVER_INTERVAL_MS, None, clock=lambda: clock / 1000)
+                oldest = []
+                def timed_handler(x, y):
+                    nonlocal clock
+                    cost = handle(x, y)
+                    clock += cost
+                    handled.append(cost)
+                    latencies.append(clock - oldest[0])
+                    oldest.clear()
+                throttle.handler = timed_handler
+                for arrival, x, y in zip(arrivals, xs, ys):
+                    while jobs and jobs[0][0] < arrival:
+                        due, callback = jobs.pop(0)
+                        clock = max(clock, due)
+                        callback()
+                    clock = max(clock, arrival)
+                    if not oldest:
+                        oldest.append(arrival)
+                    throttle.push(x, y)
+                while jobs:
+                    due, callback = jobs.pop(0)
+                    clock = max(clock, due)
+                    callback()
+            return handled, latencies
+
+        results[label] = {}
+        for mode in ('unthrottled', 'throttled'):
+            runs = [replay(mode) for _ in range(WARMUP + repeats)][WARMUP:]
+            # A frame counts as dropped when an event waits longer than one frame to reach the screen
+            dropped = statistics.median(int(sum(latency // frame_ms for latency in latencies)) for handled, latencies in runs)
+            results[label][mode] = {'handled': statistics.median(len(handled) for handled, latencies in runs),
+                                    **timing_results({'p99_handler_ms': [np.percentile(handled, 99) / 1000 for handled, latencies in runs],
+                                                      'p99_latency_ms': [np.percentile(latencies, 99) / 1000 for handled, latencies in runs]}),
+                                    'dropped_frames': dropped}
+            result = results[label][mode]
+            print(f"{label} {mode}: {result['handled']:.0f}/{events} events handled, p99 handler {result['p99_handler_ms']:.2f} ms, p99 event-to-paint {result['p99_latency_ms']:.1f} ms, "
+                  f"{dropped:.0f} dropped frames")
+    return results
+
+def start_stub_page_server(delay_ms):
+    # Local stand-in for Wikipedia, returns the server and a fetcher that rewrites page URLs to it
+    class StubHandler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(delay_ms / 1000)
+            body = f"<html><body><h1>{self.path}</h1>{'<p>lorem ipsum</p>' * 2000}</body></html>".encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    stub_root = f"http://127.0.0.1:{server.server_address[1]}/wiki/"
+
+    def stub_fetcher(url):
+        return fetch_page(url.replace("https://en.wikipedia.org/wiki/", stub_root))
+
+    return server, stub_fetcher
+
+def benchmark_detail_pages(maps, delay_ms=150, repeats=REPEATS):
+    # Cold and cached page loads through DetailLoader against a local stub server, no network needed
+    server, stub_fetcher = start_stub_page_server(delay_ms)
+    results = {}
+    try:
+        for entry in maps:
+            label = map_label(entry)
+            names = list(load_map(entry)[NAME_COLUMN].dropna())
+            timings = {'cold_ms': [], 'memory_ms': [], 'disk_ms': []}
+            for attempt in range(WARMUP + repeats):
+                with tempfile.TemporaryDirectory() as directory:
+                    # Fresh cache, then the same cache again from memory, then a new cache reading the disk copies
+                    cache = PageCache(directory)
+                    for source, cache in (('cold_ms', cache), ('memory_ms', cache), ('disk_ms', PageCache(directory))):
+                        loader = DetailLoader(stub_fetcher, cache)
+                        start = time.perf_counter()
+                        for future in [loader.load(page_url(name)) for name in names]:
+                            future.result()
+                        if attempt >= WARMUP:
+                            timings[source].append((time.perf_counter() - start) / len(names))
+                        loader.shutdown()
+            results[label] = timing_results(timings)
+            print(f"{label}: {len(names)} pages, cold {results[label]['cold_ms']:.1f} ms, memory cache {results[label]['memory_ms']:.3f} ms, "
+                  f"disk cache {results[label]['disk_ms']:.2f} ms per page")
+    finally:
+        server.shutdown()
+    return results
+
+def benchmark_detail_prefetch(maps, delay_ms=150, clicks=10, dwell_ms=300):
+    # Time to open a page after hovering a province for a moment, with and without the prefetcher
+    server, stub_fetcher = start_stub_page_server(delay_ms)
+    results = {}
+    try:
+        for entry in maps:
+            label = map_label(entry)
+            data = load_map(entry)
+            hit_tester = ProvinceHitTester(data)
+            named = data[NAME_COLUMN].dropna()
+            targets = np.random.default_rng(0).choice(named.index.to_numpy(), size=clicks, replace=False)
+            results[label] = {}
+            for mode in ('off', 'on'):
+                with tempfile.TemporaryDirectory() as directory:
+                    loader = DetailLoader(stub_fetcher, PageCache(directory))
+                    prefetcher = DetailPrefetcher(loader) if mode == 'on' else None
+                    if prefetcher is not None:
+                        prefetcher.start(list(named))
+                    opens = []
+                    for index in targets:
+                        if prefetcher is not None:
+                            prefetcher.add([data.loc[index, NAME_COLUMN]], prefetcher.HOVERED)
+                            prefetcher.add(data.loc[hit_tester.neighbors(index), NAME_COLUMN].dropna(), prefetcher.NEIGHBOR)
+                        time.sleep(dwell_ms / 1000)
+                        start = time.perf_counter()
+                        loader.load(page_url(data.loc[index, NAME_COLUMN])).result()
+                        opens.append(time.perf_counter() - start)
+                    if prefetcher is not None:
+                        prefetcher.cancel()
+                    loader.shutdown()
+                results[label][mode] = {**timing_results({'median_open_ms': opens}), 'max_open_ms': 1000 * max(opens), **loader.stats}
+                print(f"{label} prefetch {mode}: open median {results[label][mode]['median_open_ms']:.1f} ms, max {1000 * max(opens):.1f} ms, hits {loader.stats['hits']}, in flight {loader.stats['in_flight']}, misses {loader.stats['misses']}")
+    finally:
+        server.shutdown()
+    return results
+
+def benchmark_choropleth(maps, steps=20):
+    # Cost of showing a new time step of a metric: replotting with geopandas vs. recoloring the patches
+    results = {}
+    for entry in maps:
+        label = map_label(entry)
+        data = load_map(entry)
+        rng = np.random.default_rng(0)
+        # The first steps of each method are warmup and not counted
+        frames = rng.random((WARMUP + steps, len(data)))
+
+        fig = Figure(figsize=(12, 8))
+        canvas = FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
+        replot = []
+        for values in frames:
+            start = time.perf_counter()
+            ax.clear()
+            data.assign(metric=values).plot(ax=ax, column='metric', cmap='viridis', vmin=0, vmax=1, edgecolor='black', linewidth=1)
+            ax.set_axis_off()
+            canvas.draw()
+            replot.append(time.perf_counter() - start)
+
+        fig = Figure(figsize=(12, 8))
+        canvas = FigureCanvasAgg(fig)
+        renderer, hit_tester = show_map(fig.add_subplot(), data, entry)
+        canvas.draw()
+        cmap = matplotlib.colormaps.get_cmap('viridis')
+        norm = Normalize(0, 1)
+        mapping = []
+        recolor = []
+        for values in frames:
+            start = time.perf_counter()
+            colors = metric_colors(values, cmap, norm, '#FF9933')
+            mapped = time.perf_counter()
+            renderer.set_base_colors(colors)
+            canvas.draw()
+            mapping.append(mapped - start)
+            recolor.append(time.perf_counter() - start)
+
+        results[label] = timing_results({'replot_ms': replot[WARMUP:], 'color_mapping_ms': mapping[WARMUP:], 'recolor_ms': recolor[WARMUP:]})
+        print(f"{label}: replot {results[label]['replot_ms']:.1f} ms, recolor {results[label]['recolor_ms']:.1f} ms (color mapping {results[label]['color_mapping_ms']:.3f} ms) per time step")
+    return results
+
+def benchmark_animation_export(maps, frames=60, repeats=3):
+    # GIF export throughput with one worker process and with one per core
+    results = {}
+    style = map_style('#FF9933', '#009E49')
+    for entry in maps:
+        path, label = entry['geojson'], map_label(entry)
+        data = load_map(entry)
+        values = np.random.default_rng(0).random((frames, len(data)))
+        buffer = FrameBuffer(values, matplotlib.colormaps.get_cmap('viridis'), Normalize(0, 1), style['map_color'])
+        results[label] = {}
+        with tempfile.TemporaryDirectory() as directory:
+            for workers in sorted({1, os.cpu_count() or 1}):
+                export = measure(lambda: export_animation(path, entry['names'], buffer.all_frames(), os.path.join(directory, "export.gif"), style, workers=workers), repeats)
+                rate = frames / statistics.median(export)
+                results[label][workers] = {'frames_per_s': rate, **timing_results({'export_ms': export})}
+                print(f"{label}: {frames} frames with {workers} worker(s), {rate:.1f} frames/s")
+    return results
+
+def benchmark_batch_render(maps, repeats=3):
+    # Headless batch throughput of every province image of every map, one worker vs. one per core, the median of the runs after a warmup
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for workers in sorted({1, os.cpu_count() or 1}):
+            results[workers] = statistics.median([render_batch(directory, maps, workers=workers) for _ in range(WARMUP + repeats)][WARMUP:])
+            print(f"{workers} worker(s): median {results[workers]:.1f} images/s")
+    return results
+
+def benchmark_region_queries(maps, queries=200):
+    # Box, distance and neighbour queries: per-row GeoDataFrame predicates vs. the spatial index
+    results = {}
+    for entry in maps:
+        label = map_label(entry)
+        data = load_map(entry)
+        rng = np.random.default_rng(0)
+        min_x, min_y, max_x, max_y = data.total_bounds
+        width = max_x - min_x
+        xs = rng.uniform(min_x, max_x, queries)
+        ys = rng.uniform(min_y, max_y, queries)
+        boxes = [shapely.box(x, y, x + width / 10, y + width / 10) for x, y in zip(xs, ys)]
+        targets = rng.choice(data.index.to_numpy(), size=queries)
+
+        build = measure(lambda: ProvinceHitTester(data))
+        hit_tester = ProvinceHitTester(data)
+        geometries = np.asarray(data.geometry.values, dtype=object)
+
+        queries_by_name = {
+            'box_scan_us': lambda: [list(data.index[data.intersects(box)]) for box in boxes],
+            'box_index_us': lambda: [hit_tester.intersecting(box) for box in boxes],
+            'distance_scan_us': lambda: [list(data.index[shapely.distance(geometries, shapely.Point(x, y)) <= width / 20]) for x, y in zip(xs, ys)],
+            'distance_index_us': lambda: [hit_tester.within_distance(x, y, width / 20) for x, y in zip(xs, ys)],
+            'neighbors_scan_us': lambda: [list(data.index[data.intersects(data.geometry[index]) & (data.index != index)]) for index in targets],
+            'neighbors_index_us': lambda: [hit_tester.neighbors(index) for index in targets],
+        }
+        timings = {name: [sample / queries for sample in measure(query)] for name, query in queries_by_name.items()}
+
+        results[label] = timing_results({'index_build_ms': build, **timings})
+        print(f"{label}: index and adjacency built in {results[label]['index_build_ms']:.1f} ms; per query, scan vs. index: "
+              f"box {results[label]['box_scan_us']:.0f}/{results[label]['box_index_us']:.0f} us, "
+              f"distance {results[label]['distance_scan_us']:.0f}/{results[label]['distance_index_us']:.0f} us, "
+              f"neighbours {results[label]['neighbors_scan_us']:.0f}/{results[label]['neighbors_index_us']:.1f} us")
+    return results
+
+BENCHMARKS = {
+    'animation': benchmark_animation_export,
+    'assets': benchmark_assets,
+    'batch': benchmark_batch_render,
+    'build': benchmark_build,
+    'choropleth': benchmark_choropleth,
+    'click': benchmark_click_repaint,
+    'details': benchmark_detail_pages,
+    'hittest': benchmark_hit_test,
+    'hover': benchmark_hover,
+    'load': benchmark_load,
+    'memory': benchmark_memory,
+    'prefetch': benchmark_detail_prefetch,
+    'query': benchmark_region_queries,
+    'trace': benchmark_trace,
+    'registry': benchmark_registry,
+    'resize': benchmark_resize,
+    'scale': benchmark_scale,
+    'validate': benchmark_validation,
+    'lod': benchmark_level_of_detail,
+}
+
+# Benchmarks run by --benchmark suite: headless, local and deterministic, so runs on different commits compare
+BENCHMARK_SUITE = ['load', 'build', 'validate', 'lod', 'click', 'hittest', 'query', 'choropleth', 'hover', 'memory', 'resize', 'scale']
+
+# Result keys ending in one of these are costs, lower is better, and are checked by --compare
+COST_SUFFIXES = ('_ms', '_us', '_ns', '_mb', '_per_province')
+
+def benchmark_environment():
+    # What a result file was measured on, so a comparison can tell code changes from machine changes
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ""
+    return {'commit': commit, 'time': time.strftime("%Y-%m-%dT%H:%M:%S%z"), 'python': platform.python_version(), 'platform': platform.platform(),
+            'cpus': os.cpu_count(), 'numpy': np.__version__, 'shapely': shapely.__version__, 'geopandas': gpd.__version__, 'matplotlib': matplotlib.__version__}
+
+def flatten_results(results, prefix=""):
+    # {'load': {'india.geojson': {'warm_ms': 5}}} -> {'load/india.geojson/warm_ms': 5}
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}/{key}" if prefix else str(key)
+        if isinstance(value, dict):
+            flat.update(flatten_results(value, name))
+        else:
+            flat[name] = value
+    return flat
+
+def compare_benchmarks(baseline, results, threshold=0.2, sigmas=3):
+    # Costs that moved by more than `threshold` against the baseline file, slower ones first
+    # Timings must also move by more than `sigmas` times the noise of the two medians, so run-to-run jitter is not reported
+    old = flatten_results(baseline['results'])
+    new = flatten_results(results)
+    changes = []
+    for name, value in new.items():
+        if name.endswith(COST_SUFFIXES) and isinstance(old.get(name), (int, float)) and old[name] > 0 and isinstance(value, (int, float)):
+            ratio = value / old[name]
+            noise = (old.get(f"{name}_noise", 0) ** 2 + new.get(f"{name}_noise", 0) ** 2) ** 0.5
+            if abs(ratio - 1) > max(threshold, sigmas * noise):
+                changes.append((ratio, name, old[name], value, noise))
+    print(f"Against {baseline['environment'].get('commit', '')[:10] or 'baseline'}: {len(changes)} costs changed by more than {100 * threshold:.0f}% and {sigmas}x their noise")
+    for ratio, name, before, after, noise in sorted(changes, reverse=True):
+        print(f"  {'slower' if ratio > 1 else 'faster'} {ratio:5.2f}x  {name}: {before:.4g} -> {after:.4g} (noise {100 * noise:.1f}%)")
+    return changes
+
+def run_benchmarks(names, maps, json_path=None, baseline_path=None, threshold=0.2):
+    names = BENCHMARK_SUITE if names == ['suite'] else names
+    results = {}
+    for name in names:
+        print(f"== {name}")
+        results[name] = BENCHMARKS[name](maps)
+    if json_path:
+        with open(json_path, 'w') as f:
+            json.dump({'environment': benchmark_environment(), 'results': results}, f, indent=1, default=lambda value: value.item() if hasattr(value, 'item') else str(value))
+        print(f"Results written to {json_path}")
+    if baseline_path:
+        with open(baseline_path) as f:
+            compare_benchmarks(json.load(f), json.loads(json.dumps(results, default=lambda value: value.item() if hasattr(value, 'item') else str(value))), threshold)
+    return results
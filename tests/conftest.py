@@ -0,0 +1,34 @@
+import os
+import sys
+
+import matplotlib
+import pytest
+
+matplotlib.use("Agg")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The app is a single script with a space in its name, benchmarks.py loads it under the name it registers itself as
+import benchmarks  # noqa: E402
+import interactive_map  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def app():
+    return interactive_map
+
+
+@pytest.fixture
+def stub_server():
+    # Local page server with a short delay, so concurrent loads overlap with a running fetch
+    server, fetcher = benchmarks.start_stub_page_server(200)
+    calls = []
+
+    def counting_fetcher(url):
+        calls.append(url)
+        return fetcher(url)
+
+    counting_fetcher.calls = calls
+    yield counting_fetcher
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,27 @@
+import os
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_resized_image_is_reused_from_disk(app, tmp_path):
+    flag = os.path.join(ROOT, "india.png")
+    cache = app.AssetCache(str(tmp_path))
+    try:
+        assert cache.load(flag, (200, 120)).result(timeout=10).size == (200, 120)
+    finally:
+        cache.shutdown()
+
+    cache = app.AssetCache(str(tmp_path))
+    try:
+        assert cache.load(flag, (200, 120)).result(timeout=10).size == (200, 120)
+        assert cache.stats['disk'] == 1 and cache.stats['decoded'] == 0
+    finally:
+        cache.shutdown()
+
+
+def test_image_loads_when_cache_is_not_writable(app):
+    cache = app.AssetCache("/dev/null/assets")
+    try:
+        assert cache.load(os.path.join(ROOT, "india.png"), (100, 60)).result(timeout=10).size == (100, 60)
+    finally:
+        cache.shutdown()
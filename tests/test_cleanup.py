@@ -0,0 +1,46 @@
+import geopandas as gpd
+import numpy as np
+import pytest
+import shapely
+
+
+@pytest.fixture
+def raw_map():
+    # A self-intersecting bow-tie, then two squares overlapping by a 1x2 strip, the second named only by its fallback field
+    bow_tie = shapely.Polygon([(0, 0), (2, 2), (2, 0), (0, 2), (0, 0)])
+    return gpd.GeoDataFrame({'NAME_1': ["Bow", "First", "  "], 'VARNAME_1': ["", "", "Second"]},
+                            geometry=[bow_tie, shapely.box(3, 0, 5, 2), shapely.box(4, 0, 6, 2)], crs="EPSG:4326")
+
+
+def test_bow_tie_is_repaired_into_a_valid_polygon(app, raw_map):
+    data = app.prepare_geodata(raw_map, ['NAME_1', 'VARNAME_1'])
+    bow_tie = data.geometry[0]
+    assert bow_tie.is_valid
+    assert bow_tie.geom_type in ('Polygon', 'MultiPolygon')
+    # The two triangles of the bow-tie are kept
+    assert bow_tie.area == pytest.approx(2)
+    assert data.attrs['cleanup']['invalid'] == 1
+
+
+def test_later_province_loses_the_shared_area(app, raw_map):
+    data = app.prepare_geodata(raw_map, ['NAME_1', 'VARNAME_1'])
+    first, second = data.geometry[1], data.geometry[2]
+    assert first.area == pytest.approx(4)
+    assert second.area == pytest.approx(2)
+    assert first.intersection(second).area == pytest.approx(0)
+    assert data.attrs['cleanup']['overlaps'] == 1
+
+
+def test_blank_name_comes_from_the_fallback_field(app, raw_map):
+    data = app.prepare_geodata(raw_map, ['NAME_1', 'VARNAME_1'])
+    assert list(data['NAME_1']) == ["Bow", "First", "Second"]
+    assert data.attrs['cleanup']['unnamed'] == 0
+
+
+def test_bounds_and_centroids_are_stored(app, raw_map):
+    data = app.prepare_geodata(raw_map, ['NAME_1', 'VARNAME_1'])
+    geometries = np.asarray(data.geometry.values, dtype=object)
+    assert data[['minx', 'miny', 'maxx', 'maxy']].to_numpy() == pytest.approx(shapely.bounds(geometries))
+    centroids = shapely.centroid(geometries)
+    assert data['centroid_x'].to_numpy() == pytest.approx(shapely.get_x(centroids))
+    assert data['centroid_y'].to_numpy() == pytest.approx(shapely.get_y(centroids))
@@ -0,0 +1,91 @@
+import os
+import time
+
+
+def test_page_expires_after_ttl(app, tmp_path):
+    cache = app.PageCache(directory=str(tmp_path), ttl=0.2)
+    url = app.page_url("Kerala")
+    cache.put(url, "<html>Kerala</html>")
+    assert cache.get(url) == "<html>Kerala</html>"
+
+    time.sleep(0.3)
+    assert cache.get(url) is None
+    # The stale disk copy is removed as well
+    assert not os.path.exists(cache.path_for(url))
+
+
+def test_memory_keeps_most_recent_pages(app):
+    cache = app.PageCache(directory=None, max_entries=2)
+    for title in ["Goa", "Assam", "Bihar"]:
+        cache.put(app.page_url(title), title)
+    assert cache.get(app.page_url("Goa")) is None
+    assert cache.get(app.page_url("Assam")) == "Assam"
+    assert cache.get(app.page_url("Bihar")) == "Bihar"
+
+
+def test_disk_evicts_oldest_pages_over_budget(app, tmp_path):
+    cache = app.PageCache(directory=str(tmp_path), max_bytes=10 * 1024 * 1024)
+    urls = [app.page_url(f"Page {number}") for number in range(5)]
+    for age, url in enumerate(reversed(urls)):
+        cache.put(url, "x" * 1000)
+        os.utime(cache.path_for(url), (time.time() - 100 * (age + 1),) * 2)
+    # urls[0] is the oldest on disk, urls[4] the newest
+
+    cache.max_bytes = 2500
+    cache.evict()
+    assert [os.path.exists(cache.path_for(url)) for url in urls] == [False, False, False, True, True]
+
+
+def test_concurrent_loads_share_one_fetch(app, stub_server):
+    loader = app.DetailLoader(fetcher=stub_server, cache=app.PageCache(directory=None))
+    try:
+        url = app.page_url("Tamil Nadu")
+        first = loader.load(url)
+        second = loader.load(url)
+        assert second is first
+        assert "/wiki/Tamil_Nadu" in first.result(timeout=5)
+        assert stub_server.calls == [url]
+
+        # Once fetched the page comes from the cache
+        assert loader.load(url).result(timeout=5) == first.result()
+        assert loader.stats == {'hits': 1, 'in_flight': 1, 'misses': 1}
+    finally:
+        loader.shutdown()
+
+
+def test_fetch_succeeds_when_cache_is_not_writable(app, stub_server):
+    # /dev/null is a file, nothing can be created under it
+    loader = app.DetailLoader(fetcher=stub_server, cache=app.PageCache(directory="/dev/null/pages"))
+    try:
+        url = app.page_url("Punjab")
+        assert "/wiki/Punjab" in loader.load(url).result(timeout=5)
+        assert loader.load(url).done()
+    finally:
+        loader.shutdown()
+
+
+def test_prefetch_of_cached_pages_stays_off_the_caller(app, tmp_path):
+    titles = [f"Cached {number}" for number in range(3000)]
+    cache = app.PageCache(directory=str(tmp_path))
+    for title in titles:
+        with open(cache.path_for(app.page_url(title)), "w") as f:
+            f.write(title)
+
+    def offline(url):
+        raise AssertionError(f"{url} is cached")
+
+    opened = app.page_url("Opened")
+    cache.put(opened, "Opened")
+    loader = app.DetailLoader(fetcher=offline, cache=cache)
+    prefetcher = app.DetailPrefetcher(loader)
+    try:
+        prefetcher.start(titles)
+        deadline = time.time() + 30
+        while prefetcher.prefetched < len(titles) and time.time() < deadline:
+            time.sleep(0.01)
+        assert prefetcher.prefetched == len(titles)
+        assert prefetcher.active == 0
+        # Speculative disk hits are not copied into memory, the page the user opened is still there
+        assert list(cache.memory) == [opened]
+    finally:
+        loader.shutdown()
@@ -0,0 +1,63 @@
+import json
+import os
+
+import pytest
+
+
+def write_geojson(path, names):
+    # One unit square per name, in a row
+    features = [{'type': 'Feature', 'properties': {'NAME_1': name},
+                 'geometry': {'type': 'Polygon', 'coordinates': [[[number, 0], [number + 1, 0], [number + 1, 1], [number, 1], [number, 0]]]}}
+                for number, name in enumerate(names)]
+    with open(path, 'w') as f:
+        json.dump({'type': 'FeatureCollection', 'features': features}, f)
+
+
+def cache_files(cache_dir):
+    return sorted(name for name in os.listdir(cache_dir) if name.endswith('.parquet'))
+
+
+def test_edited_source_replaces_its_cache_file(app, tmp_path):
+    pytest.importorskip("pyarrow")
+    source = tmp_path / "map.geojson"
+    cache_dir = str(tmp_path / "cache")
+    write_geojson(source, ["Goa", "Assam"])
+    assert list(app.load_geodata(str(source), cache_dir)['NAME_1']) == ["Goa", "Assam"]
+    [old] = cache_files(cache_dir)
+
+    write_geojson(source, ["Goa", "Assam", "Bihar"])
+    assert list(app.load_geodata(str(source), cache_dir)['NAME_1']) == ["Goa", "Assam", "Bihar"]
+    [new] = cache_files(cache_dir)
+    assert new != old
+
+    # Loaded again unchanged, it comes from the new cache file
+    assert list(app.load_geodata(str(source), cache_dir)['NAME_1']) == ["Goa", "Assam", "Bihar"]
+    assert cache_files(cache_dir) == [new]
+
+
+def test_cache_file_shared_with_another_source_is_kept(app, tmp_path):
+    pytest.importorskip("pyarrow")
+    first, second = tmp_path / "first.geojson", tmp_path / "second.geojson"
+    cache_dir = str(tmp_path / "cache")
+    write_geojson(first, ["Goa", "Assam"])
+    write_geojson(second, ["Goa", "Assam"])
+    app.load_geodata(str(first), cache_dir)
+    app.load_geodata(str(second), cache_dir)
+    # Same content, same cache file
+    [shared] = cache_files(cache_dir)
+
+    write_geojson(first, ["Kerala"])
+    app.load_geodata(str(first), cache_dir)
+    assert shared in cache_files(cache_dir)
+    assert len(cache_files(cache_dir)) == 2
+    assert list(app.load_geodata(str(second), cache_dir)['NAME_1']) == ["Goa", "Assam"]
+
+
+def test_map_loads_when_cache_is_not_writable(app, tmp_path, capsys):
+    source = tmp_path / "map.geojson"
+    write_geojson(source, ["Goa", "Assam"])
+    # /dev/null is a file, nothing can be created under it
+    data = app.load_geodata(str(source), "/dev/null/cache")
+    assert list(data['NAME_1']) == ["Goa", "Assam"]
+    if app.pyarrow is not None:
+        assert "Could not cache" in capsys.readouterr().out
@@ -0,0 +1,34 @@
+import geopandas as gpd
+import shapely
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+
+def squares(count):
+    # A row of unit squares, one province each
+    return gpd.GeoDataFrame({'NAME_1': [f"Square {number}" for number in range(count)]},
+                            geometry=[shapely.box(number, 0, number + 1, 1) for number in range(count)], crs="EPSG:4326")
+
+
+def test_map_view_covers_the_whole_map(app):
+    fig = Figure(figsize=(4, 3))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    renderer, hit_tester, (xlim, ylim) = app.build_map_view(ax, squares(3), '#FF9933', '#009E49')
+
+    assert len(renderer.artists) == 3
+    assert hit_tester.locate(1.5, 0.5) == 1
+    assert xlim[0] <= 0 and xlim[1] >= 3 and ylim[0] <= 0 and ylim[1] >= 1
+    assert not ax.axison
+
+
+def test_selection_change_touches_only_changed_provinces(app):
+    fig = Figure(figsize=(4, 3))
+    FigureCanvasAgg(fig)
+    renderer, hit_tester, home_limits = app.build_map_view(fig.add_subplot(), squares(4), '#FF9933', '#009E49')
+    fig.canvas.draw()
+
+    assert app.change_selection(renderer, set(), {0, 1}, app.CLICKED_COLOR) == {0, 1}
+    assert app.change_selection(renderer, {0, 1}, {1, 2}, app.CLICKED_COLOR) == {0, 2}
+    assert set(renderer.highlights) == {1, 2}
+    assert app.change_selection(renderer, {1, 2}, {1, 2}, app.CLICKED_COLOR) == set()